@@ -0,0 +1,272 @@
+"""Adaptive Huffman coding (the FGK algorithm): one pass, no code table.
+
+Encoder and decoder start from the same empty tree and update it the same
+way after every symbol, so the codes follow the data as it arrives. The
+first time a byte appears it is sent as the code of the NYT ("not yet
+transmitted") node followed by the byte itself; after that it is sent as
+the code of its leaf. Nothing has to be counted in advance, so output can
+be written as soon as input is read, and the codec header only holds the
+number of symbols.
+
+Usage: python adaptive_huffman.py compress <input> <output> [--block-size 1M]
+       python adaptive_huffman.py decompress <input> <output>
+"""
+import sys
+import cli
+import container
+from bitio import BitWriter
+
+VERSION = 1
+
+# Leaves for the 256 byte values plus NYT, and the internal nodes joining them.
+MAX_NODES = 2 * 257 - 1
+ROOT = MAX_NODES - 1
+
+# First byte of a codec header.
+FRESH = 0
+CONTINUED = 1
+
+# The bits of every byte value, most significant first.
+_BITS = [tuple((byte >> shift) & 1 for shift in range(7, -1, -1)) for byte in range(256)]
+
+
+class AdaptiveHuffmanTree:
+    """Huffman tree that is updated after every symbol and stays a Huffman tree.
+
+    Nodes are numbered in sibling order: the root is ROOT, the two children
+    of a node have consecutive numbers below it, and weights never decrease
+    as numbers increase (the sibling property). Every list is indexed by
+    node number. To add one to a symbol's weight, each node on the path to
+    the root is first swapped with the highest-numbered node of the same
+    weight (unless that is its parent), which keeps the property.
+    """
+
+    def __init__(self):
+        self.weight = [0] * MAX_NODES
+        self.parent = [-1] * MAX_NODES
+        self.left = [-1] * MAX_NODES
+        self.right = [-1] * MAX_NODES
+        # Symbol of each leaf; -1 for internal nodes and NYT.
+        self.symbol = [-1] * MAX_NODES
+        # Leaf of each symbol; -1 until it has been seen.
+        self.leaf = [-1] * 256
+        self.nyt = ROOT
+
+    def code(self, node):
+        """Returns (value, length) of the path from the root to node; 1 means right."""
+        parent = self.parent
+        right = self.right
+        value = 0
+        length = 0
+        while node != ROOT:
+            up = parent[node]
+            if right[up] == node:
+                value |= 1 << length
+            length += 1
+            node = up
+        return value, length
+
+    def update(self, symbol):
+        """Counts one more occurrence of symbol, adding a leaf for it if it is new."""
+        weight = self.weight
+        parent = self.parent
+        node = self.leaf[symbol]
+        if node < 0:
+            # NYT becomes an internal node with a new NYT and the new leaf as children.
+            old_nyt = self.nyt
+            self.nyt = old_nyt - 2
+            node = old_nyt - 1
+            self.left[old_nyt] = self.nyt
+            self.right[old_nyt] = node
+            parent[self.nyt] = parent[node] = old_nyt
+            self.symbol[node] = symbol
+            self.leaf[symbol] = node
+
+        while True:
+            node_weight = weight[node]
+            leader = node
+            while leader < ROOT and weight[leader + 1] == node_weight:
+                leader += 1
+            if leader != node and leader != parent[node]:
+                self._swap(node, leader)
+                node = leader
+            weight[node] = node_weight + 1
+            if node == ROOT:
+                return
+            node = parent[node]
+
+    def _swap(self, a, b):
+        """Swaps the subtrees at nodes a and b, which have the same weight."""
+        symbol, left, right = self.symbol, self.left, self.right
+        symbol[a], symbol[b] = symbol[b], symbol[a]
+        left[a], left[b] = left[b], left[a]
+        right[a], right[b] = right[b], right[a]
+        for node in (a, b):
+            if symbol[node] >= 0:
+                self.leaf[symbol[node]] = node
+            elif left[node] >= 0:
+                self.parent[left[node]] = self.parent[right[node]] = node
+
+
+class AdaptiveHuffmanEncoder:
+    """Encodes bytes as they come; the tree carries over from one call to the next."""
+
+    def __init__(self):
+        self.tree = AdaptiveHuffmanTree()
+        self.writer = BitWriter()
+
+    def encode(self, data):
+        """Encodes data and returns the whole bytes of output ready so far."""
+        tree = self.tree
+        leaf = tree.leaf
+        code = tree.code
+        update = tree.update
+        write = self.writer.write
+        for symbol in data:
+            node = leaf[symbol]
+            if node >= 0:
+                value, length = code(node)
+                write(value, length)
+            else:
+                value, length = code(tree.nyt)
+                write((value << 8) | symbol, length + 8)
+            update(symbol)
+        return bytes(self.writer.take())
+
+    def finish(self):
+        """Returns the last partial byte, zero-padded; the tree is kept for later calls."""
+        tail, _ = self.writer.getvalue()
+        self.writer = BitWriter()
+        return bytes(tail)
+
+    def encode_block(self, data):
+        """Encodes data into a payload that ends on a byte boundary."""
+        return self.encode(data) + self.finish()
+
+
+class AdaptiveHuffmanDecoder:
+    """Decodes what AdaptiveHuffmanEncoder wrote, keeping its own copy of the tree."""
+
+    def __init__(self):
+        self.tree = AdaptiveHuffmanTree()
+
+    def decode_chunks(self, chunks, count):
+        """Decodes count symbols from a payload given chunk by chunk, yielding bytes as they are produced.
+
+        Bits after the last symbol are padding and are ignored.
+        """
+        tree = self.tree
+        left = tree.left
+        right = tree.right
+        symbol_of = tree.symbol
+        update = tree.update
+        nyt = tree.nyt
+        node = ROOT
+        # Bits of a new symbol read so far, or -1 while following a code.
+        literal_bits = 0 if nyt == ROOT else -1
+        literal = 0
+        for chunk in chunks:
+            if not count:
+                break
+            result = bytearray()
+            for byte in chunk:
+                for bit in _BITS[byte]:
+                    if literal_bits >= 0:
+                        literal = (literal << 1) | bit
+                        literal_bits += 1
+                        if literal_bits < 8:
+                            continue
+                        symbol = literal
+                    else:
+                        node = right[node] if bit else left[node]
+                        if node == nyt:
+                            literal_bits = 0
+                            literal = 0
+                            continue
+                        symbol = symbol_of[node]
+                        if symbol < 0:
+                            continue
+                    result.append(symbol)
+                    update(symbol)
+                    nyt = tree.nyt
+                    node = ROOT
+                    literal_bits = -1
+                    count -= 1
+                    if not count:
+                        break
+                if not count:
+                    break
+            yield bytes(result)
+        if count:
+            raise ValueError("Bad compressed data: it ends in the middle of a code")
+
+
+def _read_codec_header(codec_header):
+    """Returns (FRESH or CONTINUED, symbol count) from a codec header."""
+    if not codec_header or codec_header[0] not in (FRESH, CONTINUED):
+        raise ValueError("Bad adaptive Huffman header")
+    try:
+        count, _ = container.read_varint(codec_header, 1)
+    except IndexError:
+        raise ValueError("Bad adaptive Huffman header") from None
+    return codec_header[0], count
+
+
+def encode_payload(data):
+    """Compresses bytes into (codec header, payload) for the container format.
+
+    The codec header is FRESH followed by the number of symbols as a varint.
+    """
+    codec_header = bytearray([FRESH])
+    container.write_varint(codec_header, len(data))
+    return bytes(codec_header), AdaptiveHuffmanEncoder().encode_block(data)
+
+
+def decode_payload(codec_header, payload):
+    """Decodes a whole payload held in memory, starting from an empty tree."""
+    _, count = _read_codec_header(codec_header)
+    return b"".join(AdaptiveHuffmanDecoder().decode_chunks([payload], count))
+
+
+def decode_stream(codec_header, chunks):
+    """Decodes a payload given chunk by chunk, for api.decompress_path; yields bytes as they are produced."""
+    _, count = _read_codec_header(codec_header)
+    return AdaptiveHuffmanDecoder().decode_chunks(chunks, count)
+
+
+def block_encoder():
+    """Returns (stream codec header, block encoding function) for blocks.compress_stream.
+
+    One tree is shared by all blocks, so later blocks start from the codes
+    the earlier ones ended with. Each block's header is CONTINUED and its
+    symbol count.
+    """
+    encoder = AdaptiveHuffmanEncoder()
+
+    def encode(data):
+        codec_header = bytearray([CONTINUED])
+        container.write_varint(codec_header, len(data))
+        return bytes(codec_header), encoder.encode_block(data)
+
+    return b'', encode
+
+
+def block_decoder(codec_header):
+    """Returns the block decoding function for blocks.iter_decompressed.
+
+    A FRESH block was compressed on its own (see blocks.py) and is decoded
+    with an empty tree of its own.
+    """
+    decoder = AdaptiveHuffmanDecoder()
+
+    def decode(block_header, payload):
+        mode, count = _read_codec_header(block_header)
+        if mode == FRESH:
+            return decode_payload(block_header, payload)
+        return b"".join(decoder.decode_chunks([payload], count))
+
+    return decode
+
+
+if __name__ == "__main__":
+    cli.main(sys.modules[__name__], "adaptive_huffman.py")
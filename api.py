@@ -0,0 +1,261 @@
+"""In-process entry points for compressing and decompressing, for use from Python code.
+
+The command-line scripts print their results; these functions return them
+and raise exceptions instead:
+
+    import api
+    packed = api.compress(data, 'lzw')
+    assert api.decompress(packed) == data
+    stats = api.compress_path('sample.txt', 'sample-huffman.bin', 'huffman')
+    print(stats.ratio)
+
+Errors in the input (a corrupted or foreign file, a bad option) raise
+ValueError; container.ContainerError is a subclass of it.
+"""
+import io
+import os
+import shutil
+import time
+from collections import namedtuple
+
+import blocks
+import container
+
+ALGORITHMS = {name: algorithm for algorithm, name in container.ALGORITHM_NAMES.items()}
+
+Stats = namedtuple('Stats', ['algorithm', 'original_size', 'compressed_size', 'ratio', 'seconds'])
+
+
+def algorithm_id(algorithm):
+    """Looks up an algorithm id from its name (e.g. 'huffman', 'lzw', 'auto')."""
+    try:
+        return ALGORITHMS[algorithm]
+    except KeyError:
+        raise ValueError(f"Unknown algorithm '{algorithm}', expected one of {', '.join(ALGORITHMS)}") from None
+
+
+def _stats(algorithm, original_size, compressed_size, started):
+    ratio = original_size / compressed_size if compressed_size else 0.0
+    return Stats(algorithm, original_size, compressed_size, ratio, time.perf_counter() - started)
+
+
+def compress(data, algorithm='huffman', **options):
+    """Compresses bytes into a complete container and returns it.
+
+    options are passed to the codec (for LZW: max_bits and policy).
+    """
+    codec_id = algorithm_id(algorithm)
+    codec_header, payload = container.load_codec(codec_id).encode_payload(data, **options)
+    out = io.BytesIO()
+    container.write_header(out, codec_id, len(data), container.checksum(data), codec_header)
+    out.write(payload)
+    return out.getvalue()
+
+
+def measure(data, algorithm='huffman', cache=None, **options):
+    """Compresses bytes in memory and returns only the Stats, e.g. to compare algorithms.
+
+    With a cache.Cache, data compressed before is not compressed again, and
+    the Stats (including seconds) are the ones recorded back then.
+    """
+    if cache is None:
+        started = time.perf_counter()
+        return _stats(algorithm, len(data), len(compress(data, algorithm, **options)), started)
+
+    # Same key as compress_path without a block size, so either one can reuse the other's work.
+    key = cache.data_key(data, algorithm, block_size=None, parallel=False, **options)
+    hit = cache.get(key)
+    if hit is not None:
+        return Stats(**hit[1])
+    started = time.perf_counter()
+    packed = compress(data, algorithm, **options)
+    stats = _stats(algorithm, len(data), len(packed), started)
+    temp_path = cache.new_file()
+    with open(temp_path, 'wb') as f:
+        f.write(packed)
+    cache.add(key, temp_path, stats._asdict())
+    return stats
+
+
+class _CountingSink:
+    """File-like sink that only counts what is written to it."""
+
+    def __init__(self):
+        self.size = 0
+
+    def write(self, data):
+        self.size += len(data)
+
+    def tell(self):
+        return self.size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+class _ProgressReader:
+    """Passes reads through, calling progress with the bytes read before each one."""
+
+    def __init__(self, f, progress):
+        self.f = f
+        self.progress = progress
+        self.done = 0
+
+    def read(self, size):
+        self.progress(self.done)
+        data = self.f.read(size)
+        self.done += len(data)
+        return data
+
+
+def measure_path(input_file, algorithm='huffman', block_size=blocks.DEFAULT_BLOCK_SIZE, cache=None, progress=None,
+                 **options):
+    """Compresses a file block by block without saving the result and returns its Stats.
+
+    progress, if given, is called with the number of bytes compressed so
+    far before every block (and with the file size at the end); anything it
+    raises stops the run. With a cache.Cache, a file compressed the same
+    way before is not compressed again, and a new result is kept there
+    under the same key compress_path would use.
+    """
+    codec_id = algorithm_id(algorithm)
+    key = None
+    if cache is not None:
+        key = cache.file_key(input_file, algorithm, block_size=block_size, parallel=False, **options)
+        hit = cache.get(key)
+        if hit is not None:
+            if progress is not None:
+                progress(hit[1]['original_size'])
+            return Stats(**hit[1])
+
+    started = time.perf_counter()
+    temp_path = cache.new_file() if key is not None else None
+    try:
+        with open(input_file, 'rb') as f, (open(temp_path, 'wb') if temp_path else _CountingSink()) as sink:
+            source = _ProgressReader(f, progress) if progress is not None else f
+            original_size = blocks.compress_stream(source, sink, codec_id, block_size, **options)
+            compressed_size = sink.tell()
+    except BaseException:
+        if temp_path:
+            cache.discard(temp_path)
+        raise
+    stats = _stats(algorithm, original_size, compressed_size, started)
+    if temp_path:
+        cache.add(key, temp_path, stats._asdict())
+    return stats
+
+
+def _decode(source):
+    """Decodes an open container, whichever algorithm and layout it uses."""
+    header = container.read_header(source)
+    if header.flags & container.FLAG_BLOCKS:
+        return b"".join(blocks.iter_decompressed(source, header))
+    data = container.load_codec(header.algorithm).decode_payload(header.codec_header, source.read())
+    if len(data) != header.original_length or container.checksum(data) != header.checksum:
+        raise ValueError("Checksum mismatch: the compressed data is corrupted")
+    return data
+
+
+def decompress(data):
+    """Decompresses a container produced by compress() or by any of the scripts."""
+    return _decode(io.BytesIO(data))
+
+
+def compress_path(input_file, output_file, algorithm='huffman', block_size=None, workers=1, cache=None,
+                  **options):
+    """Compresses input_file into output_file and returns its Stats.
+
+    With block_size set, more than one worker, or the 'auto' algorithm, the
+    file is streamed block by block (see blocks.py) instead of being read
+    into memory whole. With a cache.Cache, a file whose contents were compressed the same way
+    before is copied from the cache instead, and the Stats returned are the
+    ones recorded when it was compressed. The cache is only used for
+    regular files: hashing a pipe such as /dev/stdin would use it up.
+    """
+    codec = container.load_codec(algorithm_id(algorithm))
+    if workers != 1 or hasattr(codec, 'encode_block'):
+        # Codecs that choose an algorithm per block (auto) always work in blocks.
+        block_size = block_size or blocks.DEFAULT_BLOCK_SIZE
+    if cache is None or not os.path.isfile(input_file):
+        return _compress_path(input_file, output_file, algorithm, block_size, workers, **options)
+
+    # The number of workers does not change the output, only whether blocks are independent.
+    key = cache.file_key(input_file, algorithm, block_size=block_size, parallel=workers != 1, **options)
+    hit = cache.get(key)
+    if hit is not None:
+        try:
+            shutil.copyfile(hit[0], output_file)
+            return Stats(**hit[1])
+        except FileNotFoundError:
+            # Evicted by another process in the meantime (a missing output directory fails again below).
+            pass
+    stats = _compress_path(input_file, output_file, algorithm, block_size, workers, **options)
+    temp_path = cache.new_file()
+    shutil.copyfile(output_file, temp_path)
+    cache.add(key, temp_path, stats._asdict())
+    return stats
+
+
+def _compress_path(input_file, output_file, algorithm, block_size, workers, **options):
+    started = time.perf_counter()
+    codec_id = algorithm_id(algorithm)
+    if block_size or workers != 1:
+        original_size = blocks.compress_file(input_file, output_file, codec_id,
+                                             block_size or blocks.DEFAULT_BLOCK_SIZE, workers, **options)
+    else:
+        with open(input_file, 'rb') as f:
+            data = f.read()
+        packed = compress(data, algorithm, **options)
+        with open(output_file, 'wb') as f:
+            f.write(packed)
+        original_size = len(data)
+    compressed_size = os.path.getsize(output_file)
+    return _stats(algorithm, original_size, compressed_size, started)
+
+
+def _decode_to(source, out, header):
+    """Decodes the payload of an open container without blocks into out and returns its size.
+
+    A codec with decode_stream(codec_header, chunks) decodes the payload as
+    it is read; the others are given it whole.
+    """
+    codec = container.load_codec(header.algorithm)
+    if hasattr(codec, 'decode_stream'):
+        pieces = codec.decode_stream(header.codec_header, container.iter_payload(source))
+    else:
+        pieces = [codec.decode_payload(header.codec_header, source.read())]
+    original_size = 0
+    checksum_value = 0
+    for piece in pieces:
+        out.write(piece)
+        original_size += len(piece)
+        checksum_value = container.checksum(piece, checksum_value)
+    if original_size != header.original_length or checksum_value != header.checksum:
+        raise ValueError("Checksum mismatch: the compressed data is corrupted")
+    return original_size
+
+
+def decompress_path(input_file, output_file, workers=1):
+    """Decompresses input_file into output_file and returns its Stats.
+
+    The algorithm is read from the file's header; this is what every
+    script's decompress command runs. Nothing is left at output_file if the
+    data turns out to be corrupted.
+    """
+    started = time.perf_counter()
+    with open(input_file, 'rb') as f:
+        header = container.read_header(f)
+        try:
+            with open(output_file, 'wb') as out:
+                if header.flags & container.FLAG_BLOCKS:
+                    original_size = blocks.decompress_stream(f, out, header, workers)
+                else:
+                    original_size = _decode_to(f, out, header)
+        except ValueError:
+            os.remove(output_file)
+            raise
+    algorithm = container.ALGORITHM_NAMES[header.algorithm]
+    return _stats(algorithm, original_size, os.path.getsize(input_file), started)
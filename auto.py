@@ -0,0 +1,104 @@
+"""Automatic codec selection: every block gets the algorithm that suits it.
+
+Before a block is compressed, a sample of it is measured two cheap ways:
+its order-0 entropy, which is about what Huffman coding can reach, and how
+far a fast LZ pass (zlib at level 1) shrinks it, which shows how much of
+the data repeats. Repetitive blocks go to LZW, the rest to Huffman, and
+blocks that neither would shrink are stored as they are. The chosen
+algorithm is recorded in each block's header (see blocks.py), so decoding
+needs nothing from this module.
+
+Shannon-Fano is never chosen: for the same symbol counts its codes are
+never shorter than Huffman's. Whatever is chosen, a block that comes out
+no smaller than it went in is stored instead, so no block ever expands.
+"""
+import sys
+import math
+import zlib
+import cli
+import container
+from prefix_codes import count_symbols
+
+INDEPENDENT_BLOCKS = True
+
+# The output is made by the codecs chosen from, so their versions are part of this one.
+VERSION = (1,) + tuple(container.load_codec(algorithm).VERSION
+                       for algorithm in (container.HUFFMAN, container.LZW, container.STORED))
+
+# The estimates look at up to SAMPLE_SLICES slices of SAMPLE_SIZE bytes spread over the block.
+SAMPLE_SIZE = 16 * 1024
+SAMPLE_SLICES = 4
+# LZW is chosen when the LZ estimate is below this fraction of the entropy estimate.
+LZ_ADVANTAGE = 0.85
+# A block whose best estimate is above this fraction of its size is stored.
+STORE_THRESHOLD = 0.97
+
+
+def sample(data):
+    """Returns the part of data the estimates look at."""
+    if len(data) <= SAMPLE_SIZE * SAMPLE_SLICES:
+        return bytes(data)
+    step = len(data) // SAMPLE_SLICES
+    return b"".join(data[start:start + SAMPLE_SIZE] for start in range(0, step * SAMPLE_SLICES, step))
+
+
+def entropy(data):
+    """Order-0 entropy of data in bits per byte."""
+    total = len(data)
+    return -sum(count / total * math.log2(count / total) for count in count_symbols(data).values())
+
+
+def choose_algorithm(data):
+    """Picks the container algorithm id to compress data with."""
+    if not data:
+        return container.STORED
+    measured = sample(data)
+    symbol_estimate = entropy(measured) / 8
+    lz_estimate = len(zlib.compress(measured, 1)) / len(measured)
+    if min(symbol_estimate, lz_estimate) > STORE_THRESHOLD:
+        return container.STORED
+    if lz_estimate < symbol_estimate * LZ_ADVANTAGE:
+        return container.LZW
+    return container.HUFFMAN
+
+
+def encode_block(data):
+    """Compresses one block with the algorithm chosen for it.
+
+    Returns (algorithm, codec header, payload) for blocks.compress_stream.
+    """
+    algorithm = choose_algorithm(data)
+    codec_header, payload = container.load_codec(algorithm).encode_payload(data)
+    if algorithm != container.STORED and len(codec_header) + len(payload) >= len(data):
+        return container.STORED, b'', bytes(data)
+    return algorithm, codec_header, payload
+
+
+def encode_payload(data):
+    """Compresses bytes into (codec header, payload) for the container format.
+
+    Used when the data is not split into blocks: the codec header is the
+    chosen algorithm id followed by that algorithm's own codec header.
+    """
+    algorithm, codec_header, payload = encode_block(data)
+    return bytes([algorithm]) + codec_header, payload
+
+
+def decode_payload(codec_header, payload):
+    if not codec_header or codec_header[0] not in container.ALGORITHM_NAMES or codec_header[0] == container.AUTO:
+        raise ValueError("Bad auto codec header")
+    return container.load_codec(codec_header[0]).decode_payload(codec_header[1:], payload)
+
+
+def block_decoder(codec_header):
+    """Returns the block decoding function for blocks.iter_decompressed.
+
+    Blocks record their own algorithm, so this is only used for a block
+    whose header says auto, and such a block carries its algorithm the way
+    encode_payload writes it.
+    """
+    return decode_payload
+
+
+if __name__ == "__main__":
+    cli.main(sys.modules[__name__], "auto.py")
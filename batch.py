@@ -0,0 +1,195 @@
+"""Compresses many files in one run: whole directories, globs or single files.
+
+Every input is compressed on its own into a container file, like running
+the algorithm script once per file, but from a single interpreter with a
+pool of worker processes. The largest files are started first, so a big
+file found last does not leave one worker busy long after the others are
+done. A file whose output is newer than the input is skipped, so running
+the same command again only compresses what changed.
+
+Example: python batch.py logs/ 'archive/**/*.txt' --algorithm lzw --output-dir compressed --workers 0
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import api
+import blocks
+import cache
+import container
+
+Job = namedtuple('Job', ['input_file', 'output_file', 'size'])
+
+
+def default_suffix(algorithm):
+    return f"-{algorithm}.bin"
+
+
+def find_inputs(patterns):
+    """Returns [(path, name)] for every file named by patterns.
+
+    A directory stands for every file below it, and name is the path
+    relative to it; for a file or glob match, name is the file name.
+    """
+    found = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for directory, subdirectories, files in os.walk(pattern):
+                subdirectories.sort()
+                for filename in sorted(files):
+                    path = os.path.join(directory, filename)
+                    found.append((path, os.path.relpath(path, pattern)))
+            continue
+        matches = sorted(glob.glob(pattern, recursive=True))
+        if not matches and not glob.has_magic(pattern):
+            raise FileNotFoundError(f"Input '{pattern}' not found")
+        found.extend((path, os.path.basename(path)) for path in matches if os.path.isfile(path))
+    return found
+
+
+def plan_jobs(patterns, suffix, output_dir=None, force=False):
+    """Returns (jobs to run, largest first; number of up-to-date files skipped).
+
+    Outputs go next to their inputs, or under output_dir keeping the layout
+    of any directory given. Files that already end with suffix are taken to
+    be outputs of an earlier run and left out.
+    """
+    jobs = []
+    skipped = 0
+    seen = set()
+    for path, name in find_inputs(patterns):
+        real_path = os.path.realpath(path)
+        if real_path in seen or path.endswith(suffix):
+            continue
+        seen.add(real_path)
+        output_file = os.path.join(output_dir, name) + suffix if output_dir else path + suffix
+        stat = os.stat(path)
+        if not force and os.path.exists(output_file) and os.path.getmtime(output_file) >= stat.st_mtime:
+            skipped += 1
+            continue
+        jobs.append(Job(path, output_file, stat.st_size))
+    jobs.sort(key=lambda job: job.size, reverse=True)
+    return jobs, skipped
+
+
+def compress_one(job, algorithm, block_size, artifacts, options):
+    """Compresses one file in a worker process and returns its Stats.
+
+    The output is written under a temporary name and renamed when complete,
+    so an interrupted run never leaves a partial file that looks up to date.
+    """
+    directory = os.path.dirname(job.output_file)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_file = job.output_file + '.tmp'
+    try:
+        stats = api.compress_path(job.input_file, temp_file, algorithm, block_size, 1, artifacts, **options)
+        os.replace(temp_file, job.output_file)
+    except BaseException:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        raise
+    return stats
+
+
+def run(jobs, algorithm, workers=0, block_size=None, artifacts=None, **options):
+    """Compresses every job on a pool of workers, printing each file as it finishes.
+
+    Returns (list of Stats, number of failures). A job that raises, or that
+    never ran because a worker died, counts as a failure and the rest go on.
+    """
+    results = []
+    failures = 0
+    with ProcessPoolExecutor(min(blocks.resolve_workers(workers), max(len(jobs), 1))) as executor:
+        # Jobs are handed out in submission order, which is largest first.
+        futures = {executor.submit(compress_one, job, algorithm, block_size, artifacts, options): job
+                   for job in jobs}
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                stats = future.result()
+            except BrokenProcessPool:
+                # A worker died (e.g. killed for running out of memory); no job left in the pool runs.
+                failures += 1
+                print(f"[!] {job.input_file}: not compressed, a worker process died")
+                continue
+            except Exception as e:
+                failures += 1
+                print(f"[!] {job.input_file}: {e or type(e).__name__}")
+                continue
+            results.append(stats)
+            print(f"[+] {job.input_file} -> {job.output_file} "
+                  f"({stats.original_size} -> {stats.compressed_size} bytes, {stats.ratio:.2f}x, {stats.seconds:.2f} s)")
+    return results, failures
+
+
+def print_summary(results, skipped, failures, elapsed):
+    original_size = sum(stats.original_size for stats in results)
+    compressed_size = sum(stats.compressed_size for stats in results)
+    busy = sum(stats.seconds for stats in results)
+    megabytes = original_size / (1024 * 1024)
+    print(f"Files compressed: {len(results)} ({skipped} up to date, {failures} failed)")
+    print(f"Input:            {original_size} bytes")
+    print(f"Output:           {compressed_size} bytes "
+          f"({original_size / compressed_size if compressed_size else 0.0:.2f}x)")
+    print(f"Elapsed:          {elapsed:.2f} s ({busy:.2f} s of compression across workers)")
+    print(f"Throughput:       {megabytes / elapsed if elapsed else 0.0:.2f} MB/s")
+
+
+def _codec_option_names(algorithm):
+    """Names of the options the algorithm's own add_arguments adds, if it has any."""
+    codec = container.load_codec(api.algorithm_id(algorithm))
+    if not hasattr(codec, 'add_arguments'):
+        return []
+    parser = argparse.ArgumentParser(add_help=False)
+    codec.add_arguments(parser)
+    return list(vars(parser.parse_args([])))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python batch.py", description=__doc__.splitlines()[0],
+                                     epilog=__doc__.splitlines()[-1])
+    parser.add_argument('inputs', nargs='+', help="files, directories or glob patterns ('**' recurses)")
+    parser.add_argument('--algorithm', choices=list(api.ALGORITHMS), default='huffman')
+    parser.add_argument('--output-dir', help="write the outputs here instead of next to the inputs")
+    parser.add_argument('--suffix', help="added to each input's name to name its output (default -ALGORITHM.bin)")
+    parser.add_argument('--workers', type=int, default=0, help="number of processes; 0 uses every CPU (default 0)")
+    parser.add_argument('--block-size', type=blocks.parse_block_size, default=None,
+                        help="stream each file in blocks of this size (e.g. 4M) instead of reading it whole")
+    parser.add_argument('--force', action='store_true', help="compress files even if their output is up to date")
+    parser.add_argument('--cache', action='store_true',
+                        help="reuse results for contents compressed the same way before (see cache.py)")
+    for algorithm in api.ALGORITHMS:
+        codec = container.load_codec(api.algorithm_id(algorithm))
+        if hasattr(codec, 'add_arguments'):
+            codec.add_arguments(parser.add_argument_group(f"{algorithm} options"))
+    args = parser.parse_args(argv)
+    if args.workers < 0:
+        parser.error("--workers cannot be negative")
+
+    options = {name: getattr(args, name) for name in _codec_option_names(args.algorithm)}
+    suffix = args.suffix or default_suffix(args.algorithm)
+    try:
+        jobs, skipped = plan_jobs(args.inputs, suffix, args.output_dir, args.force)
+    except OSError as e:
+        print(f"Error: {e}")
+        return 1
+    if not jobs:
+        print(f"Nothing to do ({skipped} up to date).")
+        return 0
+
+    print(f"--- Compressing {len(jobs)} files with {args.algorithm} ({skipped} up to date) ---")
+    started = time.perf_counter()
+    results, failures = run(jobs, args.algorithm, args.workers, args.block_size,
+                            cache.Cache() if args.cache else None, **options)
+    print_summary(results, skipped, failures, time.perf_counter() - started)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+"""Benchmarks every algorithm over a corpus of generated and real inputs.
+
+Each (algorithm, input) case runs in a fresh worker process, so its peak
+RSS is not inflated by earlier cases. For every case the data is
+compressed and decompressed in memory with the api module, the round trip
+is checked, and the best time over --repeat runs is kept.
+
+Example: python bench.py --sizes 64K,1M --repeat 3 --json results.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import api
+import bitio
+import blocks
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+KINDS = ['text', 'random', 'repetitive', 'binary']
+DEFAULT_SIZES = '64K,1M'
+SAMPLE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sample.txt')
+
+
+def make_input(kind, size):
+    """Builds size bytes of one kind of test data; the same arguments always give the same bytes."""
+    rng = random.Random(size)
+    if kind == 'text':
+        with open(SAMPLE_FILE, 'rb') as f:
+            text = f.read()
+        return (text * (size // len(text) + 1))[:size]
+    if kind == 'random':
+        return rng.randbytes(size)
+    if kind == 'repetitive':
+        return (b'ERROR connection reset by peer; retrying\n' * (size // 41 + 1))[:size]
+    if kind == 'binary':
+        # Fixed-size records of small counters, timestamps and floats, like a sensor log.
+        records = bytearray()
+        timestamp = 1_600_000_000
+        while len(records) < size:
+            timestamp += rng.randrange(1, 5)
+            records += struct.pack('<IHhf', timestamp, rng.randrange(16), rng.randrange(-300, 300), rng.random())
+        return bytes(records[:size])
+    raise ValueError(f"Unknown input kind '{kind}'")
+
+
+def peak_rss():
+    """Peak resident set size of this process in bytes, or None where it cannot be measured."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def run_case(algorithm, name, source, repeat):
+    """Benchmarks one algorithm on one input; runs in its own worker process.
+
+    source is either a path or a (kind, size) pair for make_input.
+    """
+    if isinstance(source, str):
+        with open(source, 'rb') as f:
+            data = f.read()
+    else:
+        data = make_input(*source)
+    baseline_rss = peak_rss()
+
+    compress_seconds = decompress_seconds = float('inf')
+    packed = restored = b''
+    for _ in range(repeat):
+        started = time.perf_counter()
+        packed = api.compress(data, algorithm)
+        compress_seconds = min(compress_seconds, time.perf_counter() - started)
+        started = time.perf_counter()
+        restored = api.decompress(packed)
+        decompress_seconds = min(decompress_seconds, time.perf_counter() - started)
+
+    megabytes = len(data) / (1024 * 1024)
+    rss = peak_rss()
+    return {
+        'algorithm': algorithm,
+        'input': name,
+        'original_size': len(data),
+        'compressed_size': len(packed),
+        'ratio': len(data) / len(packed) if packed else 0.0,
+        'compress_mb_s': megabytes / compress_seconds if compress_seconds else None,
+        'decompress_mb_s': megabytes / decompress_seconds if decompress_seconds else None,
+        'compress_seconds': compress_seconds,
+        'decompress_seconds': decompress_seconds,
+        'peak_rss': rss,
+        'peak_rss_over_baseline': rss - baseline_rss if rss is not None else None,
+        'round_trip_ok': restored == data,
+    }
+
+
+def build_corpus(kinds, sizes, files):
+    """Returns [(input name, source)] for run_case."""
+    corpus = []
+    for kind in kinds:
+        if kind == 'text' and not os.path.exists(SAMPLE_FILE):
+            continue
+        for size in sizes:
+            corpus.append((f"{kind}-{size}", (kind, size)))
+    for path in files:
+        corpus.append((os.path.basename(path), path))
+    return corpus
+
+
+def format_row(result):
+    def rate(value):
+        return f"{value:9.2f}" if value is not None else f"{'-':>9}"
+
+    rss = result['peak_rss']
+    rss_text = f"{rss / (1024 * 1024):8.1f}" if rss is not None else f"{'-':>8}"
+    return (f"{result['algorithm']:<16} {result['input']:<22} {result['original_size']:>10} "
+            f"{result['compressed_size']:>10} {result['ratio']:6.2f} {rate(result['compress_mb_s'])} "
+            f"{rate(result['decompress_mb_s'])} {rss_text}  {'ok' if result['round_trip_ok'] else 'FAIL'}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python bench.py", description=__doc__.splitlines()[0])
+    parser.add_argument('--algorithms', default=','.join(api.ALGORITHMS),
+                        help="comma-separated algorithms to run (default: all)")
+    parser.add_argument('--kinds', default=','.join(KINDS),
+                        help=f"comma-separated generated inputs, from {', '.join(KINDS)} (default: all)")
+    parser.add_argument('--sizes', default=DEFAULT_SIZES,
+                        help=f"comma-separated sizes of the generated inputs (default {DEFAULT_SIZES})")
+    parser.add_argument('--file', action='append', default=[], dest='files',
+                        help="also benchmark this file (can be given more than once)")
+    parser.add_argument('--repeat', type=int, default=1, help="runs per case; the fastest is kept (default 1)")
+    parser.add_argument('--json', metavar='PATH', help="also write the results as JSON to PATH")
+    args = parser.parse_args(argv)
+
+    algorithms = args.algorithms.split(',')
+    kinds = args.kinds.split(',')
+    try:
+        for algorithm in algorithms:
+            api.algorithm_id(algorithm)
+        for kind in kinds:
+            if kind not in KINDS:
+                raise ValueError(f"Unknown input kind '{kind}'")
+        sizes = [blocks.parse_block_size(size) for size in args.sizes.split(',')]
+        if args.repeat < 1:
+            raise ValueError("--repeat must be at least 1")
+    except ValueError as e:
+        parser.error(str(e))
+    corpus = build_corpus(kinds, sizes, args.files)
+
+    print(f"{'algorithm':<16} {'input':<22} {'original':>10} {'compressed':>10} {'ratio':>6} "
+          f"{'comp MB/s':>9} {'dec MB/s':>9} {'RSS MB':>8}  round trip")
+    results = []
+    context = get_context('spawn')
+    for algorithm in algorithms:
+        for name, source in corpus:
+            # A new single-use worker per case keeps peak RSS per case.
+            with ProcessPoolExecutor(1, mp_context=context) as executor:
+                result = executor.submit(run_case, algorithm, name, source, args.repeat).result()
+            results.append(result)
+            print(format_row(result), flush=True)
+
+    if args.json:
+        report = {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': bitio.np.__version__ if bitio.np is not None else None,
+            'repeat': args.repeat,
+            'results': results,
+        }
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved results to {args.json}")
+
+    return 0 if all(result['round_trip_ok'] for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
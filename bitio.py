@@ -0,0 +1,178 @@
+"""Bit-level reading and writing shared by the codecs.
+
+Bits are packed most significant bit first, and the last byte is padded
+with zero bits; the number of padding bits is returned alongside the bytes.
+NumPy, when installed, is used for the bulk operations (pack_bits,
+unpack_bits and BitWriter.write_codes); the results are the same without it.
+"""
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Number of pending bits BitWriter collects before flushing whole bytes.
+FLUSH_BITS = 256
+# Number of symbols write_codes expands to bits at a time with NumPy.
+NUMPY_BATCH = 64 * 1024
+
+
+def is_bytes(data):
+    """True for the bytes-like types NumPy can view without copying."""
+    return isinstance(data, (bytes, bytearray, memoryview))
+
+
+def pack_bits(bit_string):
+    """Packs a string of '0's and '1's into bytes, returning (bytearray, padding)."""
+    padding_amount = (8 - len(bit_string) % 8) % 8
+    if not bit_string:
+        return bytearray(), 0
+    if np is not None:
+        bits = np.frombuffer(bit_string.encode('ascii'), dtype=np.uint8) - ord('0')
+        return bytearray(np.packbits(bits).tobytes()), padding_amount
+    padded = bit_string + '0' * padding_amount
+    return bytearray(int(padded, 2).to_bytes(len(padded) // 8, 'big')), padding_amount
+
+
+def unpack_bits(byte_array, padding_amount):
+    """Unpacks bytes into a string of '0's and '1's, dropping the padding."""
+    if not byte_array:
+        return ""
+    if np is not None:
+        bits = np.unpackbits(np.frombuffer(byte_array, dtype=np.uint8)) + ord('0')
+        encoded_text_padded = bits.tobytes().decode('ascii')
+    else:
+        bit_length = len(byte_array) * 8
+        encoded_text_padded = bin(int.from_bytes(byte_array, 'big'))[2:].zfill(bit_length)
+    return encoded_text_padded[:len(encoded_text_padded) - padding_amount]
+
+
+class BitWriter:
+    """Collects bit fields into a bytearray.
+
+    Pending bits are kept in an integer accumulator and flushed as whole
+    bytes once there are FLUSH_BITS of them, so writing is linear in the
+    output size.
+    """
+
+    def __init__(self):
+        self.output = bytearray()
+        self.accumulator = 0
+        self.bit_count = 0
+
+    def __len__(self):
+        """Number of bits written so far."""
+        return len(self.output) * 8 + self.bit_count
+
+    def write(self, value, length):
+        """Appends the low length bits of value."""
+        self.accumulator = (self.accumulator << length) | value
+        self.bit_count += length
+        if self.bit_count >= FLUSH_BITS:
+            self._flush()
+
+    def _flush(self):
+        leftover = self.bit_count & 7
+        self.output += (self.accumulator >> leftover).to_bytes(self.bit_count >> 3, 'big')
+        self.accumulator &= (1 << leftover) - 1
+        self.bit_count = leftover
+
+    def write_codes(self, symbols, code_bits):
+        """Appends the code of every symbol; code_bits maps symbol -> (value, length).
+
+        This is the hot loop of the prefix-code encoders, so it works on
+        local variables, or on whole batches with NumPy for bytes input.
+        """
+        if np is not None and is_bytes(symbols):
+            self._write_codes_numpy(symbols, code_bits)
+            return
+        output = self.output
+        accumulator = self.accumulator
+        bit_count = self.bit_count
+        for symbol in symbols:
+            value, length = code_bits[symbol]
+            accumulator = (accumulator << length) | value
+            bit_count += length
+            if bit_count >= FLUSH_BITS:
+                leftover = bit_count & 7
+                output += (accumulator >> leftover).to_bytes(bit_count >> 3, 'big')
+                accumulator &= (1 << leftover) - 1
+                bit_count = leftover
+        self.accumulator = accumulator
+        self.bit_count = bit_count
+
+    def _write_codes_numpy(self, data, code_bits):
+        """Vectorized write_codes for bytes; the output is identical.
+
+        Each batch of symbols is expanded to one array element per output
+        bit: the cumulative sum of the code lengths gives where every code
+        starts, and np.repeat turns that into, for every output bit, its
+        position in a flat table holding the bits of every code. The
+        gathered bits are packed with np.packbits; bits that do not fill a
+        whole byte carry over to the next batch.
+        """
+        max_length = max((length for _, length in code_bits.values()), default=0)
+        lengths = np.zeros(256, dtype=np.int32)
+        code_table = np.zeros((256, max_length), dtype=np.uint8)
+        for symbol, (value, length) in code_bits.items():
+            lengths[symbol] = length
+            for bit in range(length):
+                code_table[symbol, bit] = (value >> (length - 1 - bit)) & 1
+        code_table = code_table.ravel()
+        rows = np.arange(256, dtype=np.int32) * max_length
+
+        self._flush()
+        carry = np.array([(self.accumulator >> (self.bit_count - 1 - bit)) & 1
+                          for bit in range(self.bit_count)], dtype=np.uint8)
+        symbols = np.frombuffer(data, dtype=np.uint8)
+        for begin in range(0, len(symbols), NUMPY_BATCH):
+            batch = symbols[begin:begin + NUMPY_BATCH]
+            batch_lengths = lengths[batch]
+            starts = np.cumsum(batch_lengths, dtype=np.int32) - batch_lengths
+            # Bit i of the batch is bit (i - start) of its symbol's code.
+            bit_count = int(starts[-1] + batch_lengths[-1])
+            index = np.repeat(rows[batch] - starts, batch_lengths)
+            index += np.arange(bit_count, dtype=np.int32)
+            bits = np.concatenate((carry, code_table[index]))
+            whole = len(bits) & ~7
+            self.output += np.packbits(bits[:whole]).tobytes()
+            carry = bits[whole:]
+
+        self.accumulator = int(np.packbits(carry)[0]) >> (8 - len(carry)) if len(carry) else 0
+        self.bit_count = len(carry)
+
+    def take(self):
+        """Removes and returns the whole bytes written so far; a partial last byte stays pending."""
+        self._flush()
+        taken = self.output
+        self.output = bytearray()
+        return taken
+
+    def getvalue(self):
+        """Returns (bytes written, padding), zero-padding the last byte."""
+        padding_amount = (8 - self.bit_count % 8) % 8
+        tail = (self.accumulator << padding_amount).to_bytes((self.bit_count + padding_amount) >> 3, 'big')
+        return self.output + tail, padding_amount
+
+
+class BitReader:
+    """Reads bit fields from bytes, in the order BitWriter wrote them."""
+
+    def __init__(self, data, bit_length=None):
+        self.data = data
+        self.bit_length = len(data) * 8 if bit_length is None else bit_length
+        self.position = 0
+
+    def bits_left(self):
+        """Number of bits not read yet."""
+        return self.bit_length - self.position
+
+    def read(self, length):
+        """Reads the next length bits as an unsigned integer."""
+        end = self.position + length
+        if end > self.bit_length:
+            raise ValueError("Bad compressed data: it ends in the middle of a code")
+        first_byte = self.position >> 3
+        last_byte = (end + 7) >> 3
+        chunk = int.from_bytes(self.data[first_byte:last_byte], 'big')
+        self.position = end
+        return (chunk >> (last_byte * 8 - end)) & ((1 << length) - 1)
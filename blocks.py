@@ -0,0 +1,324 @@
+"""Streaming, block-by-block compression on top of the container format.
+
+The input is read block_size bytes at a time, and every block is compressed
+and written out before the next one is read, so memory use depends on the
+block size rather than on the file size. Huffman and Shannon-Fano build new
+code tables for every block; LZW keeps its dictionary from one block to the
+next. Each codec module provides block_encoder() and block_decoder() for
+this.
+
+A codec that picks an algorithm for each block (auto.py) provides
+encode_block(data) instead, returning (algorithm, codec header, payload).
+That algorithm is recorded in the block's header, and such a block is
+decoded with that algorithm's decode_payload, whatever the file's own
+algorithm is.
+
+With more than one worker the blocks are compressed on a process pool and
+written back in order. Every block is then compressed on its own with the
+codec's encode_payload (LZW included), so the file is marked
+FLAG_INDEPENDENT and its blocks can be decompressed on a pool as well,
+using the block index at the end of the file to find them.
+
+A codec whose blocks never depend on each other (Huffman, Shannon-Fano,
+stored, auto) sets INDEPENDENT_BLOCKS = True in its module, and
+compress_stream then marks the file FLAG_INDEPENDENT even when it was
+compressed serially, so it can always be decoded in parallel.
+
+Every codec module also sets VERSION, which is bumped whenever its output
+for the same input changes; cache.py puts it in its keys.
+
+The same index lets read_range decode only the blocks that overlap a byte
+range of the original data.
+"""
+import os
+from bisect import bisect_right
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import container
+
+DEFAULT_BLOCK_SIZE = 4 * 1024 * 1024
+MAX_BLOCK_SIZE = 1024 * 1024 * 1024
+
+_SIZE_SUFFIXES = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+
+
+def parse_size(text):
+    """Parses a size in bytes such as '65536', '64K', '4M' or '2G'."""
+    text = text.strip().upper().rstrip('B')
+    multiplier = 1
+    if text and text[-1] in _SIZE_SUFFIXES:
+        multiplier = _SIZE_SUFFIXES[text[-1]]
+        text = text[:-1]
+    return int(text) * multiplier
+
+
+def parse_block_size(text):
+    """Parses a block size such as '65536', '64K' or '4M'."""
+    size = parse_size(text)
+    if not 0 < size <= MAX_BLOCK_SIZE:
+        raise ValueError(f"Block size must be between 1 byte and {MAX_BLOCK_SIZE} bytes")
+    return size
+
+
+def resolve_workers(workers):
+    """Turns a worker count into a number of processes; 0 or None means one per CPU."""
+    if not workers:
+        return os.cpu_count() or 1
+    if workers < 0:
+        raise ValueError("The number of workers cannot be negative")
+    return workers
+
+
+def _encode_block(algorithm, options, block):
+    """Compresses one block on its own in a worker process."""
+    codec = container.load_codec(algorithm)
+    if hasattr(codec, 'encode_block'):
+        encoded = codec.encode_block(block, **options)
+    else:
+        encoded = (algorithm,) + codec.encode_payload(block, **options)
+    return encoded + (len(block), container.checksum(block))
+
+
+def _decode_block(input_file, offset):
+    """Reads and decompresses the block at offset in a worker process."""
+    with open(input_file, 'rb') as f:
+        f.seek(offset)
+        block = container.read_block(f)
+    if block is None:
+        raise container.ContainerError("block index points past the last block")
+    data = container.load_codec(block.algorithm).decode_payload(block.codec_header, block.payload)
+    if len(data) != block.raw_length or container.checksum(data) != block.checksum:
+        raise ValueError(f"Checksum mismatch in the block at offset {offset}")
+    return data
+
+
+def _in_order(executor, function, tasks, window):
+    """Runs function over tasks on executor, yielding results in task order.
+
+    At most window tasks are in flight, so only that many blocks are held in
+    memory however long the input is.
+    """
+    pending = deque()
+    for task in tasks:
+        pending.append(executor.submit(function, *task))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def _encode_parallel(algorithm, options, blocks, workers):
+    executor = ProcessPoolExecutor(workers)
+    try:
+        tasks = ((algorithm, options, block) for block in blocks)
+        yield from _in_order(executor, _encode_block, tasks, 2 * workers)
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def compress_stream(source, sink, algorithm, block_size=DEFAULT_BLOCK_SIZE, workers=1, **options):
+    """Compresses everything readable from source into sink, one block at a time.
+
+    With workers > 1 the blocks are compressed in parallel (see the module
+    docstring). Returns the number of uncompressed bytes read.
+    """
+    if not 0 < block_size <= MAX_BLOCK_SIZE:
+        raise ValueError(f"Block size must be between 1 byte and {MAX_BLOCK_SIZE} bytes")
+    workers = resolve_workers(workers)
+    codec = container.load_codec(algorithm)
+    if hasattr(codec, 'encode_block'):
+        stream_header = b''
+
+        def encode(block):
+            return codec.encode_block(block, **options)
+    else:
+        stream_header, block_encode = codec.block_encoder(**options)
+
+        def encode(block):
+            return (algorithm,) + block_encode(block)
+    flags = container.FLAG_BLOCKS | container.FLAG_INDEX
+    if workers > 1 or getattr(codec, 'INDEPENDENT_BLOCKS', False):
+        flags |= container.FLAG_INDEPENDENT
+    offset = container.write_header(sink, algorithm, 0, 0, stream_header, flags=flags)
+
+    original_length = 0
+    checksum_value = 0
+
+    def read_blocks():
+        # The whole-input checksum is taken as blocks are read, which is
+        # the same order they are written in.
+        nonlocal original_length, checksum_value
+        while True:
+            block = source.read(block_size)
+            if not block:
+                return
+            original_length += len(block)
+            checksum_value = container.checksum(block, checksum_value)
+            yield block
+
+    if workers > 1:
+        results = _encode_parallel(algorithm, options, read_blocks(), workers)
+    else:
+        results = (encode(block) + (len(block), container.checksum(block)) for block in read_blocks())
+
+    index = []
+    raw_offset = 0
+    for block_algorithm, codec_header, payload, raw_length, block_checksum in results:
+        index.append(container.IndexEntry(raw_offset, offset))
+        offset += container.write_block(sink, block_algorithm, raw_length, block_checksum, codec_header, payload)
+        raw_offset += raw_length
+
+    offset += container.write_end(sink, original_length, checksum_value, len(index))
+    container.write_index(sink, index, offset)
+    return original_length
+
+
+def _iter_serial(source, header):
+    decode = container.load_codec(header.algorithm).block_decoder(header.codec_header)
+    block_count = 0
+    while True:
+        block = container.read_block(source)
+        if block is None:
+            break
+        if block.algorithm != header.algorithm:
+            data = container.load_codec(block.algorithm).decode_payload(block.codec_header, block.payload)
+        else:
+            data = decode(block.codec_header, block.payload)
+        if len(data) != block.raw_length or container.checksum(data) != block.checksum:
+            raise ValueError(f"Checksum mismatch in block {block_count}")
+        block_count += 1
+        yield data
+
+
+def _iter_parallel(input_file, entries, workers):
+    executor = ProcessPoolExecutor(workers)
+    try:
+        tasks = ((input_file, entry.offset) for entry in entries)
+        yield from _in_order(executor, _decode_block, tasks, 2 * workers)
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def can_decompress_in_parallel(source, header):
+    """True if the blocks of an open container can be handed to worker processes."""
+    needed = container.FLAG_BLOCKS | container.FLAG_INDEX | container.FLAG_INDEPENDENT
+    return header.flags & needed == needed and hasattr(source, 'name') and source.seekable()
+
+
+def iter_decompressed(source, header, workers=1):
+    """Yields the decompressed bytes of each block of an open FLAG_BLOCKS container.
+
+    Every block is checked against its own checksum and the whole stream
+    against the trailer; a mismatch raises ValueError. With workers > 1 and
+    a file of independent blocks, the blocks are decoded on a process pool.
+    """
+    workers = resolve_workers(workers)
+    if workers > 1 and can_decompress_in_parallel(source, header):
+        entries, trailer = container.read_index(source)
+        pieces = _iter_parallel(source.name, entries, workers)
+    else:
+        trailer = None
+        pieces = _iter_serial(source, header)
+
+    original_length = 0
+    checksum_value = 0
+    block_count = 0
+    for data in pieces:
+        original_length += len(data)
+        checksum_value = container.checksum(data, checksum_value)
+        block_count += 1
+        yield data
+
+    if trailer is None:
+        trailer = container.read_trailer(source)
+    if trailer != (original_length, checksum_value, block_count):
+        raise ValueError("Checksum mismatch: the trailer does not match the decoded blocks")
+
+
+def decompress_stream(source, sink, header, workers=1):
+    """Writes every decompressed block to sink; returns the number of bytes written."""
+    written = 0
+    for data in iter_decompressed(source, header, workers):
+        sink.write(data)
+        written += len(data)
+    return written
+
+
+def compress_file(input_file, output_file, algorithm, block_size=DEFAULT_BLOCK_SIZE, workers=1, **options):
+    """Compresses input_file into a FLAG_BLOCKS container at output_file."""
+    with open(input_file, 'rb') as f, open(output_file, 'wb') as out:
+        return compress_stream(f, out, algorithm, block_size, workers, **options)
+
+
+def _iter_indexed_blocks(f, input_file, offset):
+    """Yields (raw offset, data) for every block from the one holding offset on."""
+    entries, _ = container.read_index(f)
+    first = max(bisect_right([entry.raw_offset for entry in entries], offset) - 1, 0)
+    for entry in entries[first:]:
+        yield entry.raw_offset, _decode_block(input_file, entry.offset)
+
+
+def _iter_sequential_blocks(f, header):
+    """Yields (raw offset, data) for every block, decoding from the first one."""
+    raw_offset = 0
+    for data in _iter_serial(f, header):
+        yield raw_offset, data
+        raw_offset += len(data)
+
+
+def read_range(input_file, offset, length=None):
+    """Returns length bytes of the original data starting at offset (to the end if length is None).
+
+    Only the blocks overlapping the range are decoded when the file has a
+    block index and independent blocks. LZW blocks that share a dictionary
+    have to be decoded from the start, but decoding stops after the range.
+    Files written without --block-size are decoded whole. Like file.read,
+    a range past the end gives fewer bytes (or none).
+    """
+    if offset < 0 or (length is not None and length < 0):
+        raise ValueError("The offset and length cannot be negative")
+    end = None if length is None else offset + length
+
+    with open(input_file, 'rb') as f:
+        header = container.read_header(f)
+        if not header.flags & container.FLAG_BLOCKS:
+            data = container.load_codec(header.algorithm).decode_payload(header.codec_header, f.read())
+            if len(data) != header.original_length or container.checksum(data) != header.checksum:
+                raise ValueError("Checksum mismatch: the file is corrupted")
+            return data[offset:end]
+
+        if can_decompress_in_parallel(f, header):
+            pieces = _iter_indexed_blocks(f, input_file, offset)
+        else:
+            pieces = _iter_sequential_blocks(f, header)
+
+        result = bytearray()
+        for raw_offset, data in pieces:
+            if end is not None and raw_offset >= end:
+                break
+            if raw_offset + len(data) > offset:
+                start = max(offset - raw_offset, 0)
+                stop = None if end is None else end - raw_offset
+                result += data[start:stop]
+        return bytes(result)
+
+
+def extract_file(input_file, output_file, offset, length=None):
+    """Saves a byte range of a compressed file's original data (see read_range), printing the outcome."""
+    print(f"--- Extracting {length if length is not None else 'all'} bytes at offset {offset} from {input_file} ---")
+    try:
+        data = read_range(input_file, offset, length)
+    except FileNotFoundError:
+        print(f"Error: Input file '{input_file}' not found.")
+        return
+    except container.ContainerError as e:
+        print(f"Error: File '{input_file}' is not a valid compressed file ({e}).")
+        return
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+
+    with open(output_file, 'wb') as out:
+        out.write(data)
+    print(f"Successfully extracted {len(data)} bytes to {output_file}")
@@ -0,0 +1,183 @@
+"""On-disk cache of compressed files, keyed by the content they were made from.
+
+The same input compressed with the same algorithm and options always gives
+the same output, so it only has to be compressed once:
+
+    import api, cache
+    artifacts = cache.Cache()
+    api.compress_path('big.log', 'big.bin', 'lzw', cache=artifacts)  # compresses
+    api.compress_path('big.log', 'copy.bin', 'lzw', cache=artifacts)  # copies the cached result
+
+Each entry is a compressed file (<key>.bin) and a small JSON record of its
+stats (<key>.json). A key is a SHA-256 over the input's SHA-256, the
+algorithm and the options, so a renamed or touched file still hits and an
+edited one misses. It also covers container.VERSION and the codec module's
+VERSION, so results from an older format or encoder are not reused. When the entries add up to more than max_bytes, the
+least recently used ones are deleted; using an entry updates its
+modification time, which is what the eviction goes by. Several processes
+can share one directory: entries are renamed into place complete, and an
+entry evicted by another process is simply a miss.
+
+The directory defaults to $DAA_CACHE_DIR, or ~/.cache/daa-compression.
+"""
+import hashlib
+import json
+import os
+import tempfile
+
+import api
+import container
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+READ_SIZE = 1024 * 1024
+
+
+def default_directory():
+    return os.environ.get('DAA_CACHE_DIR') or os.path.join(os.path.expanduser('~'), '.cache', 'daa-compression')
+
+
+def data_digest(data):
+    """SHA-256 of bytes, as hex."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def codec_version(algorithm):
+    """VERSION of the module implementing an algorithm name."""
+    return container.load_codec(api.algorithm_id(algorithm)).VERSION
+
+
+def file_digest(path):
+    """SHA-256 of a file's contents, as hex."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(READ_SIZE)
+            if not chunk:
+                return digest.hexdigest()
+            digest.update(chunk)
+
+
+class Cache:
+    """A directory of compressed files with least-recently-used eviction."""
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        if max_bytes < 0:
+            raise ValueError("The cache size cannot be negative")
+        self.directory = directory or default_directory()
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+        # path -> (size, modification time, digest), so an unchanged file is hashed once.
+        self._digests = {}
+
+    def key(self, digest, algorithm, **params):
+        """Cache key for the input with this digest compressed with algorithm and params."""
+        versions = [container.VERSION, codec_version(algorithm)]
+        description = json.dumps([digest, algorithm, versions, params], sort_keys=True)
+        return hashlib.sha256(description.encode('utf-8')).hexdigest()
+
+    def data_key(self, data, algorithm, **params):
+        return self.key(data_digest(data), algorithm, **params)
+
+    def file_key(self, path, algorithm, **params):
+        """Like data_key for a regular file's contents; the digest is remembered until the file changes."""
+        path = os.path.realpath(path)
+        stat = os.stat(path)
+        cached = self._digests.get(path)
+        if cached and cached[:2] == (stat.st_size, stat.st_mtime_ns):
+            digest = cached[2]
+        else:
+            digest = file_digest(path)
+            self._digests[path] = (stat.st_size, stat.st_mtime_ns, digest)
+        return self.key(digest, algorithm, **params)
+
+    def _paths(self, key):
+        base = os.path.join(self.directory, key)
+        return base + '.bin', base + '.json'
+
+    def get(self, key):
+        """Returns (path of the compressed file, stats record) for key, or None on a miss."""
+        artifact, record_path = self._paths(key)
+        try:
+            with open(record_path) as f:
+                record = json.load(f)
+            os.utime(artifact)
+            os.utime(record_path)
+        except (OSError, ValueError):
+            return None
+        return artifact, record
+
+    def new_file(self):
+        """Returns the path of a new empty file in the cache directory, to be passed to add()."""
+        fd, path = tempfile.mkstemp(suffix='.tmp', dir=self.directory)
+        os.close(fd)
+        return path
+
+    def add(self, key, temp_path, record):
+        """Moves a file made with new_file() into the cache under key, with its stats record.
+
+        Evicts old entries if the cache has grown past max_bytes. A file
+        larger than the whole cache is not kept.
+        """
+        artifact, record_path = self._paths(key)
+        if os.path.getsize(temp_path) > self.max_bytes:
+            os.remove(temp_path)
+            return
+        record_temp = self.new_file()
+        with open(record_temp, 'w') as f:
+            json.dump(record, f)
+        os.replace(temp_path, artifact)
+        os.replace(record_temp, record_path)
+        self.evict()
+
+    def discard(self, temp_path):
+        """Deletes a file made with new_file() that is not going to be added."""
+        try:
+            os.remove(temp_path)
+        except FileNotFoundError:
+            pass
+
+    def size(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def _entries(self):
+        """Returns [(modification time, total size, key)] for every entry."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.bin'):
+                continue
+            key = name[:-len('.bin')]
+            artifact, record_path = self._paths(key)
+            try:
+                stat = os.stat(artifact)
+            except FileNotFoundError:
+                continue
+            size = stat.st_size
+            try:
+                size += os.path.getsize(record_path)
+            except FileNotFoundError:
+                # Half-written by a process that died, or being evicted by another one.
+                pass
+            entries.append((stat.st_mtime_ns, size, key))
+        return entries
+
+    def _remove(self, key):
+        for path in self._paths(key):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def evict(self):
+        """Deletes least recently used entries until the cache fits in max_bytes."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, key in entries:
+            if total <= self.max_bytes:
+                return
+            self._remove(key)
+            total -= size
+
+    def clear(self):
+        """Deletes every entry."""
+        for _, _, key in self._entries():
+            self._remove(key)
@@ -0,0 +1,122 @@
+"""Command-line interface shared by the codec scripts (huffman.py, lzw.py, shannon_fano.py and the rest)."""
+import argparse
+import os
+
+import api
+import blocks
+import cache
+import container
+
+
+def _block_size(text):
+    try:
+        return blocks.parse_block_size(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def build_parser(codec, script):
+    """Builds the argument parser for one codec script.
+
+    A codec module can define add_arguments(parser) for options of its own;
+    their values are passed to the codec as keyword arguments.
+    """
+    parser = argparse.ArgumentParser(
+        prog=f"python {script}",
+        epilog=(
+            f"Example (compress): python {script} compress sample.txt compressed.bin\n"
+            f"Example (streaming): python {script} compress big.log compressed.bin --block-size 4M\n"
+            f"Example (parallel): python {script} compress big.log compressed.bin --workers 0\n"
+            f"Example (decompress): python {script} decompress compressed.bin decompressed.txt\n"
+            f"Example (byte range): python {script} range compressed.bin part.txt --offset 1000000 --length 4096"
+        ),
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('mode', choices=['compress', 'decompress', 'range'])
+    parser.add_argument('input_file')
+    parser.add_argument('output_file')
+    parser.add_argument('--block-size', type=_block_size, default=None,
+                        help="stream the input in blocks of this size (e.g. 1M, 64M) instead of reading it whole")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="number of processes to (de)compress blocks with; 0 uses every CPU (default 1)")
+    parser.add_argument('--offset', type=int, default=0,
+                        help="range mode: where the bytes to extract start in the original data (default 0)")
+    parser.add_argument('--length', type=int, default=None,
+                        help="range mode: how many bytes to extract (default: up to the end)")
+    parser.add_argument('--cache', action='store_true',
+                        help="compress mode: reuse the result if this file was compressed the same way before "
+                             "(cache in $DAA_CACHE_DIR, or ~/.cache/daa-compression)")
+    if hasattr(codec, 'add_arguments'):
+        codec.add_arguments(parser)
+    return parser
+
+
+def compress_file(algorithm, input_file, output_file, block_size=None, workers=1, cache=None, **options):
+    """Compresses a file with api.compress_path, printing the outcome.
+
+    options are the codec's own (see its add_arguments). input_file can
+    also be a pipe such as /dev/stdin, which has no size until it has been
+    read, so only a regular file is checked for being empty.
+    """
+    print(f"--- Compressing {input_file} with {algorithm} ---")
+
+    try:
+        if os.path.isfile(input_file) and os.path.getsize(input_file) == 0:
+            print("Error: Input file is empty.")
+            return
+        stats = api.compress_path(input_file, output_file, algorithm, block_size, workers, cache, **options)
+    except FileNotFoundError as e:
+        print(f"Error: '{e.filename}' not found.")
+        return
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+
+    print(f"Original file size: {stats.original_size} bytes")
+    print(f"Compressed file size: {stats.compressed_size} bytes")
+    print(f"Compression Ratio: {stats.ratio:.2f}x")
+    print(f"Successfully compressed and saved to {output_file}")
+
+
+def decompress_file(input_file, output_file, workers=1):
+    """Decompresses a container file with api.decompress_path, printing the outcome.
+
+    The algorithm is read from the file's header, so any script can
+    decompress what any other one made.
+    """
+    print(f"--- Decompressing {input_file} ---")
+
+    try:
+        stats = api.decompress_path(input_file, output_file, workers)
+    except FileNotFoundError as e:
+        print(f"Error: '{e.filename}' not found.")
+        return
+    except container.ContainerError as e:
+        print(f"Error: File '{input_file}' is not a valid compressed file ({e}).")
+        return
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+
+    print(f"Detected {stats.algorithm} data.")
+    print(f"Successfully decompressed and saved to {output_file}")
+
+
+def main(codec, script, argv=None):
+    """Runs the compress/decompress command line for a codec module."""
+    options = vars(build_parser(codec, script).parse_args(argv))
+    mode = options.pop('mode')
+    input_file = options.pop('input_file')
+    output_file = options.pop('output_file')
+    workers = options.pop('workers')
+    offset = options.pop('offset')
+    length = options.pop('length')
+    use_cache = options.pop('cache')
+
+    if mode == 'compress':
+        compress_file(os.path.splitext(script)[0], input_file, output_file, workers=workers,
+                      cache=cache.Cache() if use_cache else None, **options)
+    elif mode == 'decompress':
+        decompress_file(input_file, output_file, workers)
+    else:
+        blocks.extract_file(input_file, output_file, offset, length)
@@ -1,50 +1,239 @@
+"""Client for the file transfer simulation: downloads a file (or part of one) from server.py.
+
+Usage: python client.py <filename_to_request> <filename_to_save_as> [--resume] [--offset N] [--length N]
+                        [--compress ALGORITHM [--decompress]]
+
+With --resume, the bytes already in filename_to_save_as are kept and only
+the rest is downloaded. A dropped connection is retried (and resumed) up
+to --retries times. A whole download is checked against the checksum the
+server sends.
+
+With --compress, the server compresses the file while sending it and the
+client saves the compressed container; add --decompress to decompress it
+while it arrives instead. The socket is then read on a background thread,
+so receiving and decompressing overlap.
+"""
+import argparse
+import os
+import queue
 import socket
 import sys
-HOST = '127.0.0.1'  
-PORT = 9999         
-BUFFER_SIZE = 4096  
+import threading
+
+import api
+import blocks
+import container
+import protocol
+
+HOST = '127.0.0.1'
+PORT = 9999
+BUFFER_SIZE = 64 * 1024
+# Received chunks of BUFFER_SIZE that may wait to be decompressed.
+PIPELINE_DEPTH = 16
+
 
+class _Receiver:
+    """File-like reader over a socket that is drained on a background thread."""
 
-if len(sys.argv) != 3:
-    print("Usage: python client.py <filename_to_request> <filename_to_save_as>")
-    print("Example: python client.py huffman_compressed.bin received_huffman.bin")
-    sys.exit(1)
+    def __init__(self, sock):
+        self.chunks = queue.Queue(PIPELINE_DEPTH)
+        self.buffer = bytearray()
+        self.finished = False
+        threading.Thread(target=self._receive, args=(sock,), daemon=True).start()
 
-filename_to_request = sys.argv[1]
-filename_to_save_as = sys.argv[2]
+    def _receive(self, sock):
+        try:
+            while True:
+                data = sock.recv(BUFFER_SIZE)
+                self.chunks.put(data)
+                if not data:
+                    return
+        except OSError as e:
+            self.chunks.put(e)
 
+    def _next_chunk(self):
+        chunk = self.chunks.get()
+        if isinstance(chunk, OSError):
+            raise ConnectionError(str(chunk))
+        if not chunk:
+            self.finished = True
+        return chunk
 
-try:
-    client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    print(f"[+] Connecting to server at {HOST}:{PORT}...")
-    client_socket.connect((HOST, PORT))
-    print("[+] Connected successfully.")
+    def read(self, size):
+        while len(self.buffer) < size and not self.finished:
+            self.buffer += self._next_chunk()
+        data = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        return data
 
-    print(f"[+] Requesting file: {filename_to_request}")
-    client_socket.send(filename_to_request.encode())
+    def __iter__(self):
+        if self.buffer:
+            yield bytes(self.buffer)
+            self.buffer.clear()
+        while not self.finished:
+            chunk = self._next_chunk()
+            if chunk:
+                yield chunk
 
-   
-    print(f"[+] Receiving data and saving to: {filename_to_save_as}")
-    with open(filename_to_save_as, "wb") as f:
-        while True:
-           
-            bytes_read = client_socket.recv(BUFFER_SIZE)
-            
+
+def download(sock, filename, save_as, offset=0, length=None, append=False):
+    """Sends one request and writes the response data to save_as; returns the Response header."""
+    sock.sendall(protocol.pack_request(filename, offset, length))
+    response = protocol.receive_response(sock)
+    if response.status != protocol.OK:
+        return response
+
+    received = 0
+    with open(save_as, "ab" if append else "wb") as f:
+        while received < response.length:
+            bytes_read = sock.recv(min(BUFFER_SIZE, response.length - received))
             if not bytes_read:
-               
-                break
-                
-        
+                raise ConnectionError(f"connection closed after {received} of {response.length} bytes")
             f.write(bytes_read)
+            received += len(bytes_read)
+    return response
+
+
+def download_compressed(sock, filename, save_as, offset, length, algorithm, decompress):
+    """Requests a file compressed on the fly; saves the container, or its decompressed bytes.
+
+    Returns the Response header. A container cut short by a dropped
+    connection raises ConnectionError.
+    """
+    sock.sendall(protocol.pack_request(filename, offset, length, algorithm))
+    response = protocol.receive_response(sock)
+    if response.status != protocol.OK:
+        return response
+
+    source = _Receiver(sock)
+    try:
+        with open(save_as, "wb") as f:
+            if decompress:
+                header = container.read_header(source)
+                blocks.decompress_stream(source, f, header)
+            else:
+                for chunk in source:
+                    f.write(chunk)
+        if not decompress:
+            # Only a complete container ends with its block index.
+            with open(save_as, "rb") as f:
+                container.read_header(f)
+                container.read_index(f)
+    except container.ContainerError as e:
+        raise ConnectionError(f"compressed stream ended early ({e})") from None
+    return response
+
+
+def file_checksum(path):
+    checksum_value = 0
+    with open(path, "rb") as f:
+        for chunk in container.iter_payload(f, BUFFER_SIZE):
+            checksum_value = container.checksum(chunk, checksum_value)
+    return checksum_value
+
+
+def fetch(filename, save_as, host=HOST, port=PORT, offset=0, length=None, resume=False, retries=3,
+          compress=None, decompress=False):
+    """Downloads filename (or the requested range of it) into save_as, printing progress.
+
+    compress names an algorithm for the server to compress with on the fly.
+    Returns True on success.
+    """
+    ranged = offset != 0 or length is not None
+    if ranged and resume:
+        print("[!] --resume cannot be combined with --offset or --length.")
+        return False
+    if compress and resume:
+        print("[!] --resume cannot be combined with --compress.")
+        return False
+    if decompress and not compress:
+        print("[!] --decompress needs --compress.")
+        return False
+    if not resume and os.path.exists(save_as):
+        os.remove(save_as)
+
+    for attempt in range(retries + 1):
+        # A whole-file download continues from whatever is already on disk.
+        have = 0 if ranged or compress or not os.path.exists(save_as) else os.path.getsize(save_as)
+        try:
+            with socket.create_connection((host, port)) as client_socket:
+                print(f"[+] Connected to server at {host}:{port}.")
+                if have:
+                    print(f"[+] Resuming '{filename}' from byte {have}")
+                else:
+                    print(f"[+] Requesting file: {filename}" + (f" compressed with {compress}" if compress else ""))
+                if compress:
+                    response = download_compressed(client_socket, filename, save_as, offset, length,
+                                                   api.algorithm_id(compress), decompress)
+                else:
+                    response = download(client_socket, filename, save_as,
+                                        offset if ranged else have, length, append=not ranged)
+        except ConnectionRefusedError:
+            print("[!] Connection refused. Is the server.py script running?")
+            return False
+        except (ConnectionError, socket.timeout) as e:
+            print(f"[!] Transfer interrupted ({e}).")
+            if attempt < retries:
+                print(f"[+] Retrying ({attempt + 1} of {retries})...")
+            continue
+        except ValueError as e:
+            # Not the expected protocol, or a decompressed block that fails its checksum.
+            print(f"[!] Error: {e}")
+            return False
+
+        if response.status != protocol.OK:
+            print(f"[!] Error from server: {protocol.STATUS_NAMES.get(response.status, response.status)}.")
+            return False
+
+        if compress:
+            saved = "decompressed, block checksums verified" if decompress else "compressed"
+            print(f"[+] File '{save_as}' received successfully ({os.path.getsize(save_as)} bytes, {saved}).")
+            return True
+        if ranged:
+            print(f"[+] Saved {response.length} bytes of '{filename}' (offset {response.offset}) to '{save_as}'.")
+            return True
+        if file_checksum(save_as) != response.checksum:
+            print(f"[!] Error: Checksum mismatch, '{save_as}' does not match the server's file. "
+                  "Download it again without --resume.")
+            return False
+        print(f"[+] File '{save_as}' received successfully ({response.total_size} bytes, checksum verified).")
+        return True
+
+    if compress:
+        print(f"[!] Giving up after {retries + 1} attempts.")
+    else:
+        print(f"[!] Giving up after {retries + 1} attempts; run again with --resume to continue.")
+    return False
+
 
-    print(f"[+] File '{filename_to_save_as}' received successfully.")
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python client.py",
+        epilog="Example: python client.py huffman_compressed.bin received_huffman.bin",
+    )
+    parser.add_argument('filename_to_request')
+    parser.add_argument('filename_to_save_as')
+    parser.add_argument('--resume', action='store_true',
+                        help="keep the bytes already saved and download only the rest")
+    parser.add_argument('--offset', type=int, default=0, help="download starting at this byte of the file")
+    parser.add_argument('--length', type=int, default=None, help="download at most this many bytes")
+    parser.add_argument('--compress', choices=list(api.ALGORITHMS),
+                        help="have the server compress the file with this algorithm while sending it")
+    parser.add_argument('--decompress', action='store_true',
+                        help="with --compress: decompress while receiving and save the original bytes")
+    parser.add_argument('--retries', type=int, default=3,
+                        help="how many times to reconnect and resume after a dropped connection (default 3)")
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    args = parser.parse_args(argv)
+    if args.offset < 0 or (args.length is not None and args.length < 0) or args.retries < 0:
+        parser.error("--offset, --length and --retries cannot be negative")
 
-except ConnectionRefusedError:
-    print("[!] Connection refused. Is the server.py script running?")
-except Exception as e:
-    print(f"[!] An error occurred: {e}")
+    ok = fetch(args.filename_to_request, args.filename_to_save_as, args.host, args.port,
+               args.offset, args.length, args.resume, args.retries, args.compress, args.decompress)
+    print("[+] Connection closed.")
+    return 0 if ok else 1
 
-finally:
 
-    client_socket.close()
-    print("[+] Connection closed.")
\ No newline at end of file
+if __name__ == "__main__":
+    sys.exit(main())
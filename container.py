@@ -0,0 +1,219 @@
+"""Framed binary file format shared by every compression algorithm.
+
+A compressed file is laid out as:
+
+    magic          4 bytes   b'DAAC'
+    version        1 byte
+    algorithm      1 byte    one of the algorithm ids below
+    flags          2 bytes
+    original size  8 bytes   length of the uncompressed data
+    checksum       4 bytes   CRC-32 of the uncompressed data
+    header size    4 bytes   length of the codec header that follows
+    codec header   variable  algorithm-specific (e.g. code lengths)
+    payload        rest of the file
+
+All integers are big-endian. The header is read on its own, so the payload
+can then be consumed incrementally with iter_payload.
+
+When FLAG_BLOCKS is set (see blocks.py) the original size and checksum in
+the header are zero and the payload is a series of blocks instead:
+
+    raw size       4 bytes   (0 marks the end of the blocks)
+    header size    4 bytes
+    payload size   4 bytes
+    checksum       4 bytes   CRC-32 of the block's uncompressed bytes
+    algorithm      1 byte    usually the file's algorithm; with auto, the one chosen for the block
+    codec header   variable
+    payload        variable
+
+followed by a trailer holding the original size (8 bytes), the checksum of
+the whole input (4 bytes) and the block count (4 bytes).
+
+When FLAG_INDEX is also set, the trailer is followed by a block index, one
+entry per block:
+
+    raw offset     8 bytes   where the block's bytes start in the original
+    file offset    8 bytes   where the block's header starts in this file
+
+and finally by an 8-byte file offset of the index and the magic b'DAIX',
+so the index can be found by reading the end of the file. FLAG_INDEPENDENT
+means every block can be decoded without the blocks before it.
+"""
+import importlib
+import struct
+import zlib
+from collections import namedtuple
+
+MAGIC = b'DAAC'
+VERSION = 1
+
+HUFFMAN = 1
+LZW = 2
+SHANNON_FANO = 3
+ADAPTIVE_HUFFMAN = 4
+STORED = 5
+AUTO = 6
+
+ALGORITHM_NAMES = {
+    HUFFMAN: 'huffman',
+    LZW: 'lzw',
+    SHANNON_FANO: 'shannon_fano',
+    ADAPTIVE_HUFFMAN: 'adaptive_huffman',
+    STORED: 'stored',
+    AUTO: 'auto',
+}
+
+# Header flags.
+FLAG_BLOCKS = 0x0001
+FLAG_INDEX = 0x0002
+FLAG_INDEPENDENT = 0x0004
+
+INDEX_MAGIC = b'DAIX'
+
+# Size of the chunks handed out by iter_payload.
+CHUNK_SIZE = 64 * 1024
+
+_HEADER = struct.Struct('>4sBBHQII')
+_BLOCK = struct.Struct('>IIIIB')
+_TRAILER = struct.Struct('>QII')
+_INDEX_ENTRY = struct.Struct('>QQ')
+_INDEX_FOOTER = struct.Struct('>Q4s')
+
+Header = namedtuple('Header', ['version', 'algorithm', 'flags', 'original_length', 'checksum', 'codec_header'])
+Block = namedtuple('Block', ['algorithm', 'raw_length', 'checksum', 'codec_header', 'payload'])
+Trailer = namedtuple('Trailer', ['original_length', 'checksum', 'block_count'])
+IndexEntry = namedtuple('IndexEntry', ['raw_offset', 'offset'])
+
+
+class ContainerError(ValueError):
+    """Raised when a file is not a valid compressed container."""
+
+
+def checksum(data, value=0):
+    """CRC-32 of data; pass the previous value to checksum data in pieces."""
+    return zlib.crc32(data, value)
+
+
+def write_varint(output, value):
+    """Appends an unsigned integer to a bytearray, 7 bits per byte."""
+    while value >= 0x80:
+        output.append((value & 0x7F) | 0x80)
+        value >>= 7
+    output.append(value)
+
+
+def read_varint(data, position):
+    """Reads a varint written by write_varint, returning (value, new position)."""
+    value = 0
+    shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
+
+
+def write_header(f, algorithm, original_length, checksum_value, codec_header=b'', flags=0):
+    """Writes the container header and returns its size; the caller writes the payload right after it."""
+    f.write(_HEADER.pack(MAGIC, VERSION, algorithm, flags, original_length, checksum_value, len(codec_header)))
+    f.write(codec_header)
+    return _HEADER.size + len(codec_header)
+
+
+def read_header(f):
+    """Reads the container header, leaving f positioned at the start of the payload."""
+    raw = f.read(_HEADER.size)
+    if len(raw) < _HEADER.size:
+        raise ContainerError("file is too short")
+    magic, version, algorithm, flags, original_length, checksum_value, header_size = _HEADER.unpack(raw)
+    if magic != MAGIC:
+        raise ContainerError("missing magic bytes")
+    if version > VERSION:
+        raise ContainerError(f"unsupported format version {version}")
+    if algorithm not in ALGORITHM_NAMES:
+        raise ContainerError(f"unknown algorithm id {algorithm}")
+    codec_header = f.read(header_size)
+    if len(codec_header) < header_size:
+        raise ContainerError("truncated codec header")
+    return Header(version, algorithm, flags, original_length, checksum_value, codec_header)
+
+
+def write_block(f, algorithm, raw_length, checksum_value, codec_header, payload):
+    """Writes one block of a FLAG_BLOCKS payload and returns the number of bytes written."""
+    f.write(_BLOCK.pack(raw_length, len(codec_header), len(payload), checksum_value, algorithm))
+    f.write(codec_header)
+    f.write(payload)
+    return _BLOCK.size + len(codec_header) + len(payload)
+
+
+def write_end(f, original_length, checksum_value, block_count):
+    """Writes the end-of-blocks marker and the trailer, returning the number of bytes written."""
+    f.write(_BLOCK.pack(0, 0, 0, 0, 0))
+    f.write(_TRAILER.pack(original_length, checksum_value, block_count))
+    return _BLOCK.size + _TRAILER.size
+
+
+def read_block(f):
+    """Reads the next block, or returns None once the end marker is reached."""
+    raw = f.read(_BLOCK.size)
+    if len(raw) < _BLOCK.size:
+        raise ContainerError("truncated block header")
+    raw_length, header_size, payload_size, checksum_value, algorithm = _BLOCK.unpack(raw)
+    if raw_length == 0:
+        return None
+    if algorithm not in ALGORITHM_NAMES:
+        raise ContainerError(f"unknown algorithm id {algorithm}")
+    codec_header = f.read(header_size)
+    payload = f.read(payload_size)
+    if len(codec_header) < header_size or len(payload) < payload_size:
+        raise ContainerError("truncated block")
+    return Block(algorithm, raw_length, checksum_value, codec_header, payload)
+
+
+def read_trailer(f):
+    """Reads the trailer that follows the end-of-blocks marker."""
+    raw = f.read(_TRAILER.size)
+    if len(raw) < _TRAILER.size:
+        raise ContainerError("truncated trailer")
+    return Trailer(*_TRAILER.unpack(raw))
+
+
+def write_index(f, entries, index_offset):
+    """Writes the block index right after the trailer; index_offset is where it starts."""
+    for entry in entries:
+        f.write(_INDEX_ENTRY.pack(*entry))
+    f.write(_INDEX_FOOTER.pack(index_offset, INDEX_MAGIC))
+
+
+def read_index(f):
+    """Reads the block index and the trailer from the end of a FLAG_INDEX container.
+
+    Returns (list of IndexEntry, Trailer). The file position is left anywhere.
+    """
+    f.seek(-_INDEX_FOOTER.size, 2)
+    index_offset, magic = _INDEX_FOOTER.unpack(f.read(_INDEX_FOOTER.size))
+    if magic != INDEX_MAGIC or index_offset < _TRAILER.size:
+        raise ContainerError("missing block index")
+    f.seek(index_offset - _TRAILER.size)
+    trailer = read_trailer(f)
+    raw = f.read(trailer.block_count * _INDEX_ENTRY.size)
+    if len(raw) < trailer.block_count * _INDEX_ENTRY.size:
+        raise ContainerError("truncated block index")
+    entries = [IndexEntry(*entry) for entry in _INDEX_ENTRY.iter_unpack(raw)]
+    return entries, trailer
+
+
+def iter_payload(f, chunk_size=CHUNK_SIZE):
+    """Yields the payload in chunks, after read_header has been called."""
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def load_codec(algorithm):
+    """Imports the module implementing an algorithm id."""
+    return importlib.import_module(ALGORITHM_NAMES[algorithm])
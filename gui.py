@@ -2,8 +2,46 @@ import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
 import subprocess
 import os
-import re
+import queue
 import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import get_context
+
+import api
+import cache
+
+# (name, method, algorithm) of every algorithm the Analysis tab compares.
+ANALYSIS_ALGORITHMS = [
+    ("Huffman", "Greedy", "huffman"),
+    ("LZW", "Dictionary", "lzw"),
+    ("Shannon-Fano", "D&C", "shannon_fano"),
+    ("Adaptive Huffman", "Greedy (one pass)", "adaptive_huffman"),
+    ("Auto", "Per-block choice", "auto"),
+]
+# Both tabs compress in blocks of this size, so they share cached results and the
+# Analysis ratios are those of the files the Compress tab writes. The analysis
+# reports progress after every block.
+BLOCK_SIZE = 256 * 1024
+# How often the Analysis tab picks up progress, in milliseconds.
+POLL_INTERVAL = 100
+
+
+class AnalysisCancelled(Exception):
+    """Raised in an analysis process when the user cancels the run."""
+
+
+def analyze_algorithm(in_file, algorithm, artifacts, updates, cancel):
+    """Measures one algorithm on in_file in a pool process, putting progress on the updates queue."""
+    started = time.perf_counter()
+
+    def progress(done):
+        if cancel.is_set():
+            raise AnalysisCancelled()
+        updates.put(('progress', algorithm, done, time.perf_counter() - started))
+
+    return api.measure_path(in_file, algorithm, BLOCK_SIZE, cache=artifacts, progress=progress)
+
 
 class CompressionApp:
     def __init__(self, root):
@@ -16,6 +54,16 @@ class CompressionApp:
         self.algorithm = tk.StringVar(value="huffman.py")
         self.mode = tk.StringVar(value="compress")
         self.server_process = None
+        # Result of the run_process thread, read on the Tk thread by poll_task.
+        self.task_updates = queue.Queue()
+        # Messages from the analysis thread, read on the Tk thread by poll_analysis.
+        self.analysis_updates = queue.Queue()
+        self.analysis_cancel = None
+        try:
+            # Compressions and analyses of the same file reuse each other's results (see BLOCK_SIZE).
+            self.cache = cache.Cache()
+        except OSError:
+            self.cache = None
         
         style = ttk.Style()
         style.theme_use('clam')
@@ -89,6 +137,8 @@ class CompressionApp:
         ttk.Radiobutton(options_frame, text="Huffman (Greedy)", variable=self.algorithm, value="huffman.py").grid(row=1, column=1, padx=5, sticky=tk.W)
         ttk.Radiobutton(options_frame, text="LZW (Dictionary)", variable=self.algorithm, value="lzw.py").grid(row=1, column=2, padx=5, sticky=tk.W)
         ttk.Radiobutton(options_frame, text="Shannon-Fano (D&C)", variable=self.algorithm, value="shannon_fano.py").grid(row=1, column=3, padx=5, sticky=tk.W)
+        ttk.Radiobutton(options_frame, text="Adaptive Huffman (One-pass)", variable=self.algorithm, value="adaptive_huffman.py").grid(row=1, column=4, padx=5, sticky=tk.W)
+        ttk.Radiobutton(options_frame, text="Auto (Per block)", variable=self.algorithm, value="auto.py").grid(row=1, column=5, padx=5, sticky=tk.W)
     
         out_frame = ttk.Frame(frame)
         out_frame.pack(fill=tk.X, pady=5)
@@ -97,7 +147,8 @@ class CompressionApp:
         self.output_file_label.pack(side=tk.LEFT, fill=tk.X, expand=True)
         
    
-        ttk.Button(frame, text="RUN TASK", style="Accent.TButton", command=self.run_process).pack(fill=tk.X, ipady=10, pady=20)
+        self.run_btn = ttk.Button(frame, text="RUN TASK", style="Accent.TButton", command=self.run_process)
+        self.run_btn.pack(fill=tk.X, ipady=10, pady=20)
 
     def select_input(self):
         filename = filedialog.askopenfilename(title="Select Input File")
@@ -119,7 +170,7 @@ class CompressionApp:
 
         if mode == "compress":
 
-            if "-huffman" in basename or "-lzw" in basename or "-shannon_fano" in basename:
+            if any(f"-{name}" in basename for name in api.ALGORITHMS):
                 basename = basename.split('-')[0] # Get original name, e.g., "alice"
             
             out_filename = f"{basename}-{algo_name}.bin"
@@ -131,29 +182,56 @@ class CompressionApp:
         self.output_file_label.config(text=full_out_path)
 
     def run_process(self):
-        """Runs the selected compression/decompression script."""
-        script = self.algorithm.get()
+        """Runs the selected compression/decompression in-process on a worker thread."""
+        algorithm = self.algorithm.get().split('.')[0]
         mode = self.mode.get()
         in_file = self.input_file.get()
         out_file = self.output_file.get()
 
-        if not all([script, mode, in_file, out_file]):
+        if not all([algorithm, mode, in_file, out_file]):
             messagebox.showerror("Error", "Please select an input file.")
             return
 
-        command = ['python', script, mode, in_file, out_file]
-        self.log(f"Running command: {' '.join(command)}")
+        self.log(f"Running: {mode} {in_file} -> {out_file} ({algorithm})")
         self.log("-" * 30)
-        
+        # One task at a time, so two runs never write the same output file.
+        self.run_btn.config(state="disabled")
+        threading.Thread(target=self.run_task, args=(algorithm, mode, in_file, out_file), daemon=True).start()
+        self.root.after(POLL_INTERVAL, self.poll_task)
+
+    def run_task(self, algorithm, mode, in_file, out_file):
+        """Body of the run_process worker thread; its report goes on self.task_updates.
+
+        Tk must only be used from its own thread, so this never touches a widget.
+        """
         try:
-            result = subprocess.run(command, capture_output=True, text=True, check=True, encoding='utf-8')
-            self.log(result.stdout)
-            self.log("--- SUCCESS ---")
-        except subprocess.CalledProcessError as e:
-            self.log("--- ERROR ---")
-            self.log(e.stderr)
-        except FileNotFoundError:
-            self.log(f"Error: Script '{script}' not found. Are all .py files in the same folder?")
+            if mode == "compress":
+                stats = api.compress_path(in_file, out_file, algorithm, BLOCK_SIZE, cache=self.cache)
+            else:
+                stats = api.decompress_path(in_file, out_file)
+        except Exception as e:
+            self.task_updates.put(f"--- ERROR ---\n{e or type(e).__name__}")
+            return
+
+        self.task_updates.put("\n".join([
+            f"Algorithm: {stats.algorithm}",
+            f"Original file size: {stats.original_size} bytes",
+            f"Compressed file size: {stats.compressed_size} bytes",
+            f"Compression Ratio: {stats.ratio:.2f}x",
+            f"Time: {stats.seconds:.2f} s",
+            f"Saved to {out_file}",
+            "--- SUCCESS ---",
+        ]))
+
+    def poll_task(self):
+        """Logs the run_process thread's report once it is ready and re-enables RUN TASK."""
+        try:
+            report = self.task_updates.get_nowait()
+        except queue.Empty:
+            self.root.after(POLL_INTERVAL, self.poll_task)
+            return
+        self.log(report)
+        self.run_btn.config(state="normal")
 
 
 
@@ -246,15 +324,23 @@ class CompressionApp:
         ttk.Button(in_frame, text="Browse...", command=self.select_analysis_file).pack(side=tk.LEFT, padx=5)
         
        
-        ttk.Button(frame, text="RUN FULL ANALYSIS", style="Accent.TButton", command=self.run_analysis).pack(fill=tk.X, ipady=10, pady=20)
+        buttons = ttk.Frame(frame)
+        buttons.pack(fill=tk.X, pady=20)
+        self.analysis_btn = ttk.Button(buttons, text="RUN FULL ANALYSIS", style="Accent.TButton", command=self.run_analysis)
+        self.analysis_btn.pack(side=tk.LEFT, fill=tk.X, expand=True, ipady=10)
+        self.cancel_analysis_btn = ttk.Button(buttons, text="Cancel", command=self.cancel_analysis, state="disabled")
+        self.cancel_analysis_btn.pack(side=tk.LEFT, padx=(10, 0), ipady=10)
         
-        ttk.Label(frame, text="Comparison Table", style="Header.TLabel").pack(anchor=tk.W, pady=(10, 5))
+        ttk.Label(frame, text="Comparison Table", style="Header.TLabel").pack(anchor=tk.W, pady=(10, 0))
+        ttk.Label(frame, text=f"Sizes and ratios are for {BLOCK_SIZE // 1024} KB blocks, as the Compress tab writes them."
+                  ).pack(anchor=tk.W, pady=(0, 5))
         
-        cols = ('Algorithm', 'Method', 'Original Size (bytes)', 'Compressed Size (bytes)', 'Ratio')
+        cols = ('Algorithm', 'Method', 'Original Size (bytes)', 'Compressed Size (bytes)', 'Ratio',
+                'Progress', 'Time (s)', 'MB/s')
         self.tree = ttk.Treeview(frame, columns=cols, show='headings', height=5)
         for col in cols:
             self.tree.heading(col, text=col)
-            self.tree.column(col, width=150, anchor=tk.CENTER)
+            self.tree.column(col, width=150 if col in cols[:4] else 80, anchor=tk.CENTER)
         self.tree.pack(fill=tk.BOTH, expand=True)
         
     def select_analysis_file(self):
@@ -266,76 +352,129 @@ class CompressionApp:
             self.analysis_file_entry.config(state="readonly")
 
     def run_analysis(self):
-        self.log("\n" + "="*30 + "\nStarting Full Analysis...\n" + "="*30)
-        
         in_file = self.analysis_file_entry.get()
         if not in_file:
             messagebox.showerror("Error", "Please select a file to analyze.")
             return
+        try:
+            total = os.path.getsize(in_file)
+        except OSError as e:
+            messagebox.showerror("Error", f"Cannot read {in_file}: {e}")
+            return
 
-
+        self.log("\n" + "="*30 + "\nStarting Full Analysis...\n" + "="*30)
         for i in self.tree.get_children():
             self.tree.delete(i)
-            
-        algorithms = [
-            ("Huffman", "Greedy", "huffman.py"),
-            ("LZW", "Dictionary", "lzw.py"),
-            ("Shannon-Fano", "D&C", "shannon_fano.py")
-        ]
-        
-        results = []
-        for name, method, script in algorithms:
-            self.log(f"--- Analyzing {name} ---")
-            out_file = f"temp_analysis_{name}.bin"
-            command = ['python', script, 'compress', in_file, out_file]
-            
-            try:
-                result = subprocess.run(command, capture_output=True, text=True, check=True, encoding='utf-8')
-                self.log(result.stdout)
-                
-                # Parse the output
-                parsed_data = self.parse_script_output(result.stdout)
-                if parsed_data:
-                    results.append((name, method, parsed_data['original'], parsed_data['compressed'], parsed_data['ratio']))
-                else:
-                    self.log(f"Could not parse output for {name}")
-
-                if os.path.exists(out_file):
-                    os.remove(out_file)
-                    
-            except Exception as e:
-                self.log(f"Failed to run {name}: {e}")
-        
-
-        results.sort(key=lambda x: x[4], reverse=True)
-
-        for res in results:
-            self.tree.insert("", tk.END, values=res)
-            
-        self.log("="*30 + "\nAnalysis Complete.\n" + "="*30)
-        
-    def parse_script_output(self, output):
-        """Parses the console output from your scripts to find the data."""
-        data = {}
+        for name, method, algorithm in ANALYSIS_ALGORITHMS:
+            self.tree.insert("", tk.END, iid=algorithm, values=(name, method, total, "", "", "queued", "", ""))
+
+        self.analysis_cancel = threading.Event()
+        self.analysis_btn.config(state="disabled")
+        self.cancel_analysis_btn.config(state="normal")
+        threading.Thread(target=self.analyze, args=(in_file, self.analysis_cancel), daemon=True).start()
+        self.root.after(POLL_INTERVAL, self.poll_analysis, total)
+
+    def cancel_analysis(self):
+        if self.analysis_cancel is not None:
+            self.analysis_cancel.set()
+            self.cancel_analysis_btn.config(state="disabled")
+            self.log("Cancelling analysis...")
+
+    def analyze(self, in_file, cancelled):
+        """Body of the run_analysis thread: runs every algorithm at once on a process pool.
+
+        Pool processes put their progress on a manager queue; this thread
+        passes it on to self.analysis_updates along with each result, and
+        always ends with a 'finished' message, so the Analysis tab is
+        released whatever goes wrong. The manager is started with spawn,
+        like the pool, since forking a threaded Tk process is unsafe.
+        """
+        updates = self.analysis_updates
+        context = get_context('spawn')
         try:
-
-            org_match = re.search(r"Original file size: (\d+)", output)
-            comp_match = re.search(r"Compressed file size: (\d+)", output)
-            ratio_match = re.search(r"Compression Ratio: ([0-9.]+)", output)
-            
-            if org_match and comp_match and ratio_match:
-                data['original'] = int(org_match.group(1))
-                data['compressed'] = int(comp_match.group(1))
-                data['ratio'] = float(ratio_match.group(1))
-                return data
+            with context.Manager() as manager:
+                worker_updates = manager.Queue()
+                worker_cancel = manager.Event()
+                with ProcessPoolExecutor(len(ANALYSIS_ALGORITHMS), mp_context=context) as executor:
+                    futures = {executor.submit(analyze_algorithm, in_file, algorithm, self.cache,
+                                               worker_updates, worker_cancel): algorithm
+                               for _, _, algorithm in ANALYSIS_ALGORITHMS}
+                    pending = set(futures)
+                    while pending:
+                        done, pending = wait(pending, timeout=POLL_INTERVAL / 1000, return_when=FIRST_COMPLETED)
+                        if cancelled.is_set():
+                            worker_cancel.set()
+                        while not worker_updates.empty():
+                            updates.put(worker_updates.get())
+                        for future in done:
+                            algorithm = futures[future]
+                            try:
+                                updates.put(('done', algorithm, future.result()))
+                            except AnalysisCancelled:
+                                updates.put(('cancelled', algorithm))
+                            except Exception as e:
+                                # Includes a broken pool or a worker running out of memory.
+                                updates.put(('failed', algorithm, str(e) or type(e).__name__))
         except Exception as e:
-            self.log(f"Parsing error: {e}")
-            
-        return None
+            updates.put(('error', str(e) or type(e).__name__))
+        finally:
+            updates.put(('finished',))
+
+    def poll_analysis(self, total):
+        """Applies the analysis thread's messages to the table; reschedules itself until it finishes."""
+        while True:
+            try:
+                message = self.analysis_updates.get_nowait()
+            except queue.Empty:
+                self.root.after(POLL_INTERVAL, self.poll_analysis, total)
+                return
+            kind, *details = message
+            if kind == 'progress':
+                algorithm, done, elapsed = details
+                percent = done * 100 // total if total else 100
+                speed = done / elapsed / (1024 * 1024) if elapsed else 0.0
+                self.update_row(algorithm, **{'Progress': f"{percent}%", 'Time (s)': f"{elapsed:.1f}",
+                                              'MB/s': f"{speed:.2f}"})
+            elif kind == 'done':
+                algorithm, stats = details
+                speed = stats.original_size / stats.seconds / (1024 * 1024) if stats.seconds else 0.0
+                self.update_row(algorithm, **{
+                    'Compressed Size (bytes)': stats.compressed_size, 'Ratio': round(stats.ratio, 2),
+                    'Progress': "done", 'Time (s)': f"{stats.seconds:.2f}", 'MB/s': f"{speed:.2f}"})
+                self.log(f"{self.tree.set(algorithm, 'Algorithm')}: {stats.compressed_size} bytes "
+                         f"({stats.ratio:.2f}x) in {stats.seconds:.2f} s")
+            elif kind == 'cancelled':
+                self.update_row(details[0], Progress="cancelled")
+            elif kind == 'failed':
+                algorithm, error = details
+                self.update_row(algorithm, Progress="failed")
+                self.log(f"Failed to run {self.tree.set(algorithm, 'Algorithm')}: {error}")
+            elif kind == 'error':
+                self.log(f"Analysis failed: {details[0]}")
+            else:
+                self.show_analysis()
+                return
+
+    def update_row(self, algorithm, **values):
+        for column, value in values.items():
+            self.tree.set(algorithm, column, value)
+
+    def show_analysis(self):
+        """Orders the finished table by compression ratio, best first."""
+        rows = self.tree.get_children()
+        ratios = {row: self.tree.set(row, 'Ratio') for row in rows}
+        ordered = sorted(rows, key=lambda row: float(ratios[row]) if ratios[row] else 0.0, reverse=True)
+        for index, row in enumerate(ordered):
+            self.tree.move(row, "", index)
+
+        self.analysis_cancel = None
+        self.analysis_btn.config(state="normal")
+        self.cancel_analysis_btn.config(state="disabled")
+        self.log("="*30 + "\nAnalysis Complete.\n" + "="*30)
 
 if __name__ == "__main__":
     root = tk.Tk()
     app = CompressionApp(root)
 
-    root.protocol("WM_DELETE_WINDOW", lambda: (app.stop_server(), root.destroy()))
+    root.protocol("WM_DELETE_WINDOW", lambda: (app.stop_server(), app.cancel_analysis(), root.destroy()))
     root.mainloop()
\ No newline at end of file
@@ -1,7 +1,16 @@
 import heapq
-import os
 import sys 
-import pickle 
+import cli
+from bitio import pack_bits, unpack_bits
+from prefix_codes import MAX_CODE_LENGTH_LIMIT, canonical_codes, count_symbols, decode_bytes, encode_to_bytes, pack_code_lengths, unpack_code_lengths
+
+# 2: code lengths limited to MAX_CODE_LENGTH.
+VERSION = 2
+
+# Codes are never longer than this by default, as in DEFLATE.
+MAX_CODE_LENGTH = 15
+# Every byte value must fit.
+MIN_CODE_LENGTH = 8
 
 class HuffmanNode:
     def __init__(self, char, freq):
@@ -14,13 +23,8 @@ class HuffmanNode:
         return self.freq < other.freq
 
 def build_frequency_table(text):
-    """Calculates the frequency of each character in the text."""
-    freq_table = {}
-    for char in text:
-        if char not in freq_table:
-            freq_table[char] = 0
-        freq_table[char] += 1
-    return freq_table
+    """Calculates the frequency of each symbol (byte value or character) in the text."""
+    return count_symbols(text)
 
 def build_huffman_tree(freq_table):
     """Builds the Huffman Tree using a priority queue."""
@@ -43,162 +47,152 @@ def build_huffman_tree(freq_table):
     return priority_queue[0]
 
 def build_codes_table(tree_root):
-    """Generates the Huffman codes by traversing the tree."""
+    """Generates the Huffman codes by walking the tree with an explicit stack."""
     codes_table = {}
-
-    def traverse_tree(current_node, current_code):
+    stack = [(tree_root, "")]
+    while stack:
+        current_node, current_code = stack.pop()
         if current_node.char is None:
-            traverse_tree(current_node.left, current_code + "0")
-            traverse_tree(current_node.right, current_code + "1")
+            # Right is pushed first so the left subtree is coded first.
+            stack.append((current_node.right, current_code + "1"))
+            stack.append((current_node.left, current_code + "0"))
         else:
-            codes_table[current_node.char] = current_code
-
-    traverse_tree(tree_root, "")
+            # A lone symbol still needs one bit per occurrence.
+            codes_table[current_node.char] = current_code or "0"
     return codes_table
 
-def huffman_compress(text):
-    """Compresses a given string using Huffman Coding."""
-    if not text:
+def huffman_compress(data):
+    """Compresses bytes into a string of '0's and '1's using Huffman Coding.
+
+    Returns the bit string and the codes table {byte value: code}, which
+    huffman_decompress needs to decode it.
+    """
+    if not data:
         return "", {}
-    freq_table = build_frequency_table(text)
+    freq_table = build_frequency_table(data)
     huffman_tree_root = build_huffman_tree(freq_table)
     codes_table = build_codes_table(huffman_tree_root)
-    encoded_text = ""
-    for char in text:
-        encoded_text += codes_table[char]
+    encoded_text = unpack_bits(*encode_to_bytes(data, codes_table))
     return encoded_text, codes_table
 
+def build_code_lengths(tree_root):
+    """Finds the depth of every leaf, which is the length of its Huffman code."""
+    lengths = {}
+    stack = [(tree_root, 0)]
+    while stack:
+        current_node, depth = stack.pop()
+        if current_node.char is None:
+            stack.append((current_node.right, depth + 1))
+            stack.append((current_node.left, depth + 1))
+        else:
+            # A lone symbol still needs one bit per occurrence.
+            lengths[current_node.char] = max(1, depth)
+    return lengths
+
+def limit_code_lengths(freq_table, max_length):
+    """Finds the best code lengths no longer than max_length bits (the package-merge algorithm).
+
+    Each symbol is a coin worth 2 ** -length for every length it could
+    have. Starting from the longest allowed length, the coins of a length
+    are paired up, cheapest first, into packages that count as coins of
+    the next shorter length. Of the final list, the 2n - 2 cheapest items
+    are kept, and the length of a symbol's code is the number of times
+    its coin appears in them.
+    """
+    symbols = sorted(freq_table, key=freq_table.get)
+    if len(symbols) == 1:
+        return {symbols[0]: 1}
+    if len(symbols) > 1 << max_length:
+        raise ValueError(f"{len(symbols)} symbols do not fit in codes of at most {max_length} bits")
+
+    # An item is (weight, symbol index or -1, first half, second half).
+    coins = [(freq_table[symbol], index, None, None) for index, symbol in enumerate(symbols)]
+    items = coins
+    for _ in range(max_length - 1):
+        packages = [(items[i][0] + items[i + 1][0], -1, items[i], items[i + 1])
+                    for i in range(0, len(items) - 1, 2)]
+        # On equal weights a coin comes before a package.
+        items = list(heapq.merge(coins, packages, key=lambda item: item[0]))
+
+    counts = [0] * len(symbols)
+    stack = items[:2 * len(symbols) - 2]
+    while stack:
+        _, index, first, second = stack.pop()
+        if index >= 0:
+            counts[index] += 1
+        else:
+            stack.append(first)
+            stack.append(second)
+    return {symbol: counts[index] for index, symbol in enumerate(symbols)}
+
+def huffman_compress_bytes(data, max_length=MAX_CODE_LENGTH):
+    """Compresses bytes straight into packed bytes using canonical Huffman codes.
+
+    No code is longer than max_length bits: when the Huffman tree is deeper
+    than that, the lengths come from limit_code_lengths instead. Returns the
+    packed bytes, the padding amount and the code lengths, which are all the
+    decoder needs to rebuild the same canonical codes.
+    """
+    if not MIN_CODE_LENGTH <= max_length <= MAX_CODE_LENGTH_LIMIT:
+        raise ValueError(f"Maximum code length must be between {MIN_CODE_LENGTH} and {MAX_CODE_LENGTH_LIMIT} bits")
+    if not data:
+        return bytearray(), 0, {}
+    freq_table = build_frequency_table(data)
+    huffman_tree_root = build_huffman_tree(freq_table)
+    lengths = build_code_lengths(huffman_tree_root)
+    if max(lengths.values()) > max_length:
+        lengths = limit_code_lengths(freq_table, max_length)
+    codes_table = canonical_codes(lengths)
+    byte_array, padding = encode_to_bytes(data, codes_table)
+    return byte_array, padding, lengths
+
 def huffman_decompress(encoded_text, codes_table):
-    """Decompresses a string using the Huffman codes table."""
+    """Decompresses a bit string from huffman_compress back into bytes using its codes table."""
     if not encoded_text:
-        return ""
-    reversed_codes_table = {code: char for char, code in codes_table.items()}
-    decoded_text = ""
-    current_code = ""
-    for bit in encoded_text:
-        current_code += bit
-        if current_code in reversed_codes_table:
-            char = reversed_codes_table[current_code]
-            decoded_text += char
-            current_code = ""
-    return decoded_text
-
-
-def pack_bits(encoded_text):
-    padding_amount = (8 - len(encoded_text) % 8) % 8
-    padded_encoded_text = encoded_text + ('0' * padding_amount)
-    
-
-    byte_list = []
-    for i in range(0, len(padded_encoded_text), 8):
-        byte = padded_encoded_text[i:i+8]
-        byte_list.append(int(byte, 2))
-        
+        return b""
+    byte_array, padding = pack_bits(encoded_text)
+    return bytes(decode_bytes(byte_array, padding, codes_table))
 
-    return bytearray(byte_list), padding_amount
 
-def unpack_bits(byte_array, padding_amount):
-    """Unpacks bytes into a string of '0's and '1's."""
-    encoded_text_padded = ""
-    for byte in byte_array:
+def encode_payload(data, max_length=MAX_CODE_LENGTH):
+    """Compresses bytes into (codec header, payload) for the container format."""
+    byte_array, padding, lengths = huffman_compress_bytes(data, max_length)
+    codec_header = bytes([padding]) + pack_code_lengths(lengths)
+    return codec_header, bytes(byte_array)
 
-        encoded_text_padded += bin(byte)[2:].zfill(8)
-        
+def decode_payload(codec_header, payload):
+    """Rebuilds the canonical codes from the codec header and decodes the payload."""
+    if not codec_header:
+        raise ValueError("Bad Huffman header")
+    padding = codec_header[0]
+    lengths = unpack_code_lengths(codec_header[1:])
+    return decode_bytes(payload, padding, canonical_codes(lengths))
 
-    encoded_text = encoded_text_padded[:len(encoded_text_padded) - padding_amount]
-    return encoded_text
 
+INDEPENDENT_BLOCKS = True
 
-def compress_file(input_file, output_file):
-    """Reads a file, compresses it, and saves it to a new file."""
-    print(f"--- Compressing {input_file} ---")
-    
 
-    try:
-        with open(input_file, 'r', encoding='utf-8') as f:
-            text = f.read()
-    except FileNotFoundError:
-        print(f"Error: Input file '{input_file}' not found.")
-        return
-        
-    if not text:
-        print("Error: Input file is empty.")
-        return
+def block_encoder(max_length=MAX_CODE_LENGTH):
+    """Returns (stream codec header, block encoding function) for blocks.compress_stream.
 
+    Every block gets its own code table, so blocks are independent.
+    """
+    def encode(data):
+        return encode_payload(data, max_length)
 
-    encoded_text, codes_table = huffman_compress(text)
-    
-
-    byte_array, padding = pack_bits(encoded_text)
+    return b'', encode
 
-    data_to_save = {
-        'codes': codes_table,
-        'padding': padding,
-        'data': byte_array
-    }
 
-    with open(output_file, 'wb') as f:
-        pickle.dump(data_to_save, f)
-        
+def add_arguments(parser):
+    """Adds the Huffman-specific command-line options."""
+    parser.add_argument('--max-length', type=int, default=MAX_CODE_LENGTH,
+                        help=f"longest code in bits, {MIN_CODE_LENGTH}-{MAX_CODE_LENGTH_LIMIT} (default {MAX_CODE_LENGTH})")
 
-    original_size = os.path.getsize(input_file)
-    compressed_size = os.path.getsize(output_file)
-    ratio = original_size / compressed_size
-    
-    print(f"Original file size: {original_size} bytes")
-    print(f"Compressed file size: {compressed_size} bytes")
-    print(f"Compression Ratio: {ratio:.2f}x")
-    print(f"Successfully compressed and saved to {output_file}")
-
-
-def decompress_file(input_file, output_file):
-    print(f"--- Decompressing {input_file} ---")
-
-    # 1. Load the "package" from the compressed file
-    try:
-        with open(input_file, 'rb') as f:
-            loaded_data = pickle.load(f)
-    except FileNotFoundError:
-        print(f"Error: Input file '{input_file}' not found.")
-        return
-    except pickle.UnpicklingError:
-        print(f"Error: File '{input_file}' is not a valid compressed file.")
-        return
-
-    codes_table = loaded_data['codes']
-    padding = loaded_data['padding']
-    byte_array = loaded_data['data']
-
-    # 2. Unpack the bytes back into the bit string
-    encoded_text = unpack_bits(byte_array, padding)
-    
-    # 3. Decompress the bit string (using your original function)
-    decoded_text = huffman_decompress(encoded_text, codes_table)
-    
-    # 4. Save the decompressed text to the output file
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(decoded_text)
-        
-    print(f"Successfully decompressed and saved to {output_file}")
 
+def block_decoder(codec_header):
+    """Returns the block decoding function for blocks.iter_decompressed."""
+    return decode_payload
 
 
 if __name__ == "__main__":
-        
-    if len(sys.argv) != 4:
-        print("Usage: python huffman.py <mode> <input_file> <output_file>")
-        print("Example (compress): python huffman.py compress sample.txt huffman_compressed.bin")
-        print("Example (decompress): python huffman.py decompress huffman_compressed.bin decompressed.txt")
-        sys.exit(1) 
-        
-    mode = sys.argv[1]
-    input_file = sys.argv[2]
-    output_file = sys.argv[3]
-    
-    if mode == 'compress':
-        compress_file(input_file, output_file)
-    elif mode == 'decompress':
-        decompress_file(input_file, output_file)
-    else:
-        print(f"Error: Invalid mode '{mode}'. Please use 'compress' or 'decompress'.")
-        sys.exit(1)
\ No newline at end of file
+    cli.main(sys.modules[__name__], "huffman.py")
@@ -0,0 +1,97 @@
+"""Load test for server.py: many clients downloading a file at the same time.
+
+Each of --clients concurrent clients makes --requests downloads in a row,
+using the same protocol as client.py (see protocol.py). The report gives
+requests per second, aggregate throughput and latency percentiles.
+
+Example: python loadtest.py sample-huffman.bin --clients 32 --requests 50
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+import protocol
+from server import HOST, PORT
+
+READ_SIZE = 256 * 1024
+
+
+async def fetch(host, port, filename):
+    """Downloads one file and returns (bytes received, whether that is the whole response).
+
+    Returns None if the server refused the request.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(protocol.pack_request(filename))
+        await writer.drain()
+        response = await protocol.read_response(reader)
+        if response.status != protocol.OK:
+            return None
+        received = 0
+        while received < response.length:
+            chunk = await reader.read(min(READ_SIZE, response.length - received))
+            if not chunk:
+                break
+            received += len(chunk)
+        return received, received == response.length
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+async def run_client(host, port, filename, requests, latencies, results):
+    for _ in range(requests):
+        started = time.perf_counter()
+        results.append(await fetch(host, port, filename))
+        latencies.append(time.perf_counter() - started)
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+async def run(host, port, filename, clients, requests):
+    latencies = []
+    results = []
+    started = time.perf_counter()
+    await asyncio.gather(*(run_client(host, port, filename, requests, latencies, results) for _ in range(clients)))
+    elapsed = time.perf_counter() - started
+
+    total_bytes = sum(result[0] for result in results if result is not None)
+    latencies.sort()
+    short = sum(1 for result in results if result is not None and not result[1])
+    refused = results.count(None)
+    print(f"Requests:        {len(results)} ({clients} clients x {requests})")
+    print(f"Elapsed:         {elapsed:.2f} s")
+    print(f"Requests/sec:    {len(results) / elapsed:.1f}")
+    print(f"Throughput:      {total_bytes / elapsed / (1024 * 1024):.1f} MB/s ({total_bytes} bytes)")
+    print(f"Latency p50:     {percentile(latencies, 0.50) * 1000:.1f} ms")
+    print(f"Latency p99:     {percentile(latencies, 0.99) * 1000:.1f} ms")
+    print(f"Short responses: {short}")
+    print(f"Refused:         {refused}")
+    return short == 0 and refused == 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python loadtest.py", description=__doc__.splitlines()[0])
+    parser.add_argument('filename', help="file to request, relative to the server's --root")
+    parser.add_argument('--clients', type=int, default=8, help="number of concurrent clients (default 8)")
+    parser.add_argument('--requests', type=int, default=10, help="downloads per client (default 10)")
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    args = parser.parse_args(argv)
+    if args.clients < 1 or args.requests < 1:
+        parser.error("--clients and --requests must be at least 1")
+
+    try:
+        ok = asyncio.run(run(args.host, args.port, args.filename, args.clients, args.requests))
+    except ConnectionRefusedError:
+        print("[!] Connection refused. Is the server.py script running?")
+        return 1
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,37 @@
 import sys 
-import os  
-import pickle 
-from io import StringIO 
+import cli
 
-def lzw_compress(text):
+VERSION = 1
+
+# Codes start out this many bits wide.
+MIN_WIDTH = 9
+# Default and largest allowed maximum code width.
+MAX_BITS = 16
+MAX_BITS_LIMIT = 24
+
+# Code telling the decoder to drop its dictionary; new entries start after it.
+CLEAR_CODE = 256
+FIRST_CODE = 257
+
+# What to do once the dictionary is full (see lzw_compress_packed).
+POLICIES = ['freeze', 'reset', 'adaptive']
+DEFAULT_POLICY = 'adaptive'
+# Input bytes between ratio checks for the 'adaptive' policy.
+CHECK_GAP = 10000
+
+def lzw_compress(data):
+    """Compresses bytes into a list of LZW codes, with a dictionary that never stops growing.
+
+    This is the plain textbook version; the container format uses
+    LZWEncoder, which packs the codes into bits and bounds the dictionary.
+    """
+    data = bytes(data)
     dict_size = 256
-    dictionary = {chr(i): i for i in range(dict_size)}
-    w = ""
+    dictionary = {bytes([i]): i for i in range(dict_size)}
+    w = b""
     compressed_output = []
-    for c in text:
+    for i in range(len(data)):
+        c = data[i:i + 1]
         wc = w + c
         if wc in dictionary:
             w = wc
@@ -23,100 +46,325 @@ def lzw_compress(text):
 
 
 def lzw_decompress(compressed_data):
+    """Decodes a list of codes from lzw_compress back into bytes."""
+    if not compressed_data:
+        return b""
     dict_size = 256
-    dictionary = {i: chr(i) for i in range(dict_size)}
-    result = StringIO()
-    w = chr(compressed_data.pop(0))
-    result.write(w)
-    for k in compressed_data:
+    dictionary = {i: bytes([i]) for i in range(dict_size)}
+    result = bytearray()
+    codes = iter(compressed_data)
+    first = next(codes)
+    if first not in dictionary:
+        raise ValueError(f"Bad compressed code: {first}")
+    w = dictionary[first]
+    result += w
+    for k in codes:
         if k in dictionary:
             entry = dictionary[k]
         elif k == dict_size:
-            entry = w + w[0]
+            entry = w + w[:1]
         else:
             raise ValueError(f"Bad compressed code: {k}")
-        result.write(entry)
-        dictionary[dict_size] = w + entry[0]
+        result += entry
+        dictionary[dict_size] = w + entry[:1]
         dict_size += 1
         w = entry
-    return result.getvalue()
-
-
-def compress_file(input_file, output_file):
-    """Reads a file, compresses it, and saves the list of codes."""
-    print(f"--- Compressing {input_file} with LZW ---")
-    
-    try:
-        with open(input_file, 'r', encoding='ascii', errors='ignore') as f:
-            text = f.read()
-    except FileNotFoundError:
-        print(f"Error: Input file '{input_file}' not found.")
-        return
-        
-    if not text:
-        print("Error: Input file is empty.")
-        return
-
-    # 1. Compress the text (using your original function)
-    compressed_data_list = lzw_compress(text)
-    
-    # 2. Save the list of codes to the output file using pickle
-    with open(output_file, 'wb') as f:
-        pickle.dump(compressed_data_list, f)
-        
-    # --- Analysis ---
-    original_size = os.path.getsize(input_file)
-    compressed_size = os.path.getsize(output_file)
-    ratio = original_size / compressed_size
-    
-    print(f"Original file size: {original_size} bytes")
-    print(f"Compressed file size: {compressed_size} bytes")
-    print(f"Compression Ratio: {ratio:.2f}x")
-    print(f"Successfully compressed and saved to {output_file}")
-
-
-def decompress_file(input_file, output_file):
-    """Reads a compressed LZW file, decompresses it, and saves the text."""
-    print(f"--- Decompressing {input_file} with LZW ---")
-
-    # 1. Load the list of codes from the compressed file
-    try:
-        with open(input_file, 'rb') as f:
-            compressed_data_list = pickle.load(f)
-    except FileNotFoundError:
-        print(f"Error: Input file '{input_file}' not found.")
-        return
-    except pickle.UnpicklingError:
-        print(f"Error: File '{input_file}' is not a valid compressed file.")
-        return
-
-    # 2. Decompress the list of codes (using your original function)
-    decoded_text = lzw_decompress(compressed_data_list)
-    
-    # 3. Save the decompressed text to the output file
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(decoded_text)
-        
-    print(f"Successfully decompressed and saved to {output_file}")
+    return bytes(result)
+
+
+def code_width(next_code):
+    """Bits needed to write any code below next_code (never fewer than MIN_WIDTH)."""
+    return max(MIN_WIDTH, (next_code - 1).bit_length())
+
+
+class LZWEncoder:
+    """Compresses bytes into a bitstream of variable-width codes, one block at a time.
+
+    Each code is written with just enough bits for the largest code the
+    dictionary could hold at that point, starting at 9 bits and growing by
+    one bit every time the next free code crosses a power of two. The
+    dictionary never grows past 2 ** max_bits codes; what happens then is
+    decided by policy:
+
+    'freeze'    keep using the full dictionary as it is.
+    'reset'     emit CLEAR_CODE and start again from a fresh dictionary.
+    'adaptive'  keep the full dictionary while the compression ratio keeps
+                improving, and reset it once the ratio drops (like compress -d).
+
+    Dictionary entries are keyed by the integer (prefix_code << 8) | symbol
+    rather than by the phrase itself, so each step costs one int lookup no
+    matter how long the current phrase is.
+
+    The dictionary carries over from one encode_block call to the next.
+    Every block ends with the code for its last phrase and is padded to a
+    whole byte, so its payload decodes to exactly that block's bytes.
+    """
+
+    def __init__(self, max_bits=MAX_BITS, policy=DEFAULT_POLICY):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown dictionary policy: {policy}")
+        if not MIN_WIDTH <= max_bits <= MAX_BITS_LIMIT:
+            raise ValueError(f"Maximum code width must be between {MIN_WIDTH} and {MAX_BITS_LIMIT} bits")
+        self.max_bits = max_bits
+        self.policy = policy
+        self.dictionary = {}
+        self.next_code = FIRST_CODE
+        self.in_count = 0
+        self.out_bits = 0
+        self.checkpoint = CHECK_GAP
+        self.best_ratio = 0.0
+
+    def encode_block(self, data):
+        """Compresses one block, continuing from the dictionary left by earlier blocks."""
+        if not data:
+            return b''
+        policy = self.policy
+        max_size = 1 << self.max_bits
+        dictionary = self.dictionary
+        next_code = self.next_code
+        out_bits = self.out_bits
+        checkpoint = self.checkpoint
+        best_ratio = self.best_ratio
+        output = bytearray()
+        accumulator = 0
+        bit_count = 0
+        symbols = iter(data)
+        w = next(symbols)
+        for in_count, symbol in enumerate(symbols, self.in_count + 2):
+            code = dictionary.get((w << 8) | symbol)
+            if code is not None:
+                w = code
+                continue
+
+            width = (next_code - 1).bit_length()
+            accumulator = (accumulator << width) | w
+            bit_count += width
+            if next_code < max_size:
+                dictionary[(w << 8) | symbol] = next_code
+                next_code += 1
+            elif policy == 'reset' or (policy == 'adaptive' and in_count >= checkpoint):
+                clear = policy == 'reset'
+                if not clear:
+                    checkpoint = in_count + CHECK_GAP
+                    ratio = in_count / (out_bits + len(output) * 8 + bit_count)
+                    if ratio > best_ratio:
+                        best_ratio = ratio
+                    else:
+                        clear = True
+                if clear:
+                    accumulator = (accumulator << width) | CLEAR_CODE
+                    bit_count += width
+                    dictionary.clear()
+                    next_code = FIRST_CODE
+                    best_ratio = 0.0
+            if bit_count >= 32:
+                leftover = bit_count & 7
+                output += (accumulator >> leftover).to_bytes(bit_count >> 3, 'big')
+                accumulator &= (1 << leftover) - 1
+                bit_count = leftover
+            w = symbol
+
+        width = code_width(next_code)
+        accumulator = (accumulator << width) | w
+        bit_count += width
+        padding = (8 - bit_count % 8) % 8
+        output += (accumulator << padding).to_bytes((bit_count + padding) >> 3, 'big')
+
+        self.next_code = next_code
+        self.in_count += len(data)
+        self.out_bits = out_bits + len(output) * 8
+        self.checkpoint = checkpoint
+        self.best_ratio = best_ratio
+        return bytes(output)
+
+
+class LZWDecoder:
+    """Decodes the code stream written by LZWEncoder, keeping the dictionary between blocks.
+
+    The decoder adds each dictionary entry one code later than the encoder,
+    so while it is still adding entries it reads codes at the width for
+    next_code + 1. CLEAR_CODE drops the dictionary, as the encoder did.
+
+    Entries are kept in flat arrays instead of as strings: prefix[code] is
+    the code of the phrase minus its last symbol, suffix[code] that last
+    symbol and length[code] the phrase length. start[code] remembers where
+    the phrase was last written to the output; while that is still in the
+    current chunk's buffer the phrase is copied from there, otherwise it is
+    rebuilt by walking the prefixes backwards into a reusable buffer. The
+    arrays start with room for 9-bit codes and double as the dictionary
+    grows, so a small input never pays for a wide max_bits.
+    """
+
+    def __init__(self, max_bits=MAX_BITS):
+        if not MIN_WIDTH <= max_bits <= MAX_BITS_LIMIT:
+            raise ValueError(f"Maximum code width must be between {MIN_WIDTH} and {MAX_BITS_LIMIT} bits")
+        self.max_size = 1 << max_bits
+        capacity = 1 << MIN_WIDTH
+        self.prefix = [0] * capacity
+        self.suffix = bytearray(range(256)) + bytearray(capacity - 256)
+        self.length = [1] * 256 + [0] * (capacity - 256)
+        self.start = [-1] * capacity
+        self.phrase = bytearray(256)
+        self.next_code = FIRST_CODE
+        # Output offset where the next chunk's buffer begins.
+        self.base = 0
+
+    def decode_chunks(self, chunks):
+        """Decodes one block's payload chunk by chunk, yielding bytes as they are produced."""
+        max_size = self.max_size
+        prefix = self.prefix
+        suffix = self.suffix
+        length = self.length
+        start = self.start
+        phrase = self.phrase
+        next_code = self.next_code
+        capacity = len(prefix)
+        base = self.base
+        accumulator = 0
+        bit_count = 0
+        w = -1
+        for chunk in chunks:
+            position = 0
+            size = len(chunk)
+            result = bytearray()
+            while True:
+                if w < 0 or next_code == max_size:
+                    width = code_width(next_code)
+                else:
+                    width = code_width(next_code + 1)
+                while bit_count < width and position < size:
+                    accumulator = (accumulator << 8) | chunk[position]
+                    position += 1
+                    bit_count += 8
+                if bit_count < width:
+                    break
+                bit_count -= width
+                k = accumulator >> bit_count
+                accumulator &= (1 << bit_count) - 1
+
+                if k == CLEAR_CODE:
+                    next_code = FIRST_CODE
+                    w = -1
+                    continue
+                offset = base + len(result)
+                if k < 256:
+                    result.append(k)
+                    first = k
+                elif k < next_code or (k == next_code and w >= 0 and next_code < max_size):
+                    # KwKwK: an unknown code is w followed by w's own first symbol.
+                    code = k if k < next_code else w
+                    size_k = length[code]
+                    phrase_start = start[code] - base
+                    if phrase_start >= 0:
+                        result += result[phrase_start:phrase_start + size_k]
+                        first = result[offset - base]
+                    else:
+                        if size_k > len(phrase):
+                            phrase.extend(bytearray(size_k - len(phrase) + 256))
+                        index = size_k - 1
+                        while code >= 256:
+                            phrase[index] = suffix[code]
+                            code = prefix[code]
+                            index -= 1
+                        phrase[0] = first = code
+                        result += phrase[:size_k]
+                    if k == next_code:
+                        result.append(first)
+                else:
+                    raise ValueError(f"Bad compressed code: {k}")
+
+                if w >= 0 and next_code < max_size:
+                    if next_code == capacity:
+                        # The arrays are extended in place, so the local names stay valid.
+                        prefix += [0] * capacity
+                        suffix += bytearray(capacity)
+                        length += [0] * capacity
+                        start += [-1] * capacity
+                        capacity *= 2
+                    prefix[next_code] = w
+                    suffix[next_code] = first
+                    length[next_code] = length[w] + 1
+                    start[next_code] = offset - length[w]
+                    next_code += 1
+                start[k] = offset
+                w = k
+            base += len(result)
+            yield bytes(result)
+        self.next_code = next_code
+        self.base = base
+
+    def decode_block(self, codec_header, payload):
+        """Decodes one whole block payload held in memory.
+
+        A block with a codec header of its own was compressed on its own (see
+        blocks.py) and is decoded with a fresh dictionary.
+        """
+        if codec_header:
+            return decode_payload(codec_header, payload)
+        return b"".join(self.decode_chunks([payload]))
+
+
+def lzw_compress_packed(data, max_bits=MAX_BITS, policy=DEFAULT_POLICY):
+    """Compresses bytes into a single packed code stream (see LZWEncoder)."""
+    return LZWEncoder(max_bits, policy).encode_block(data)
+
+
+def lzw_decompress_stream(chunks, max_bits=MAX_BITS):
+    """Decodes a packed code stream chunk by chunk, yielding bytes as they are produced."""
+    return LZWDecoder(max_bits).decode_chunks(chunks)
+
+
+def encode_payload(data, max_bits=MAX_BITS, policy=DEFAULT_POLICY):
+    """Compresses bytes into (codec header, payload) for the container format.
+
+    The codec header records the maximum code width and the policy.
+    """
+    codec_header = bytes([max_bits, POLICIES.index(policy)])
+    return codec_header, lzw_compress_packed(data, max_bits, policy)
+
+
+def _read_max_bits(codec_header):
+    """Returns the maximum code width recorded in a codec header."""
+    if not codec_header:
+        raise ValueError("Bad LZW header")
+    return codec_header[0]
+
+
+def decode_payload(codec_header, payload):
+    """Decodes a whole packed code stream held in memory."""
+    return b"".join(lzw_decompress_stream([payload], _read_max_bits(codec_header)))
+
+
+def decode_stream(codec_header, chunks):
+    """Decodes a payload given chunk by chunk, for api.decompress_path; yields bytes as they are produced."""
+    return lzw_decompress_stream(chunks, _read_max_bits(codec_header))
+
+
+def block_encoder(max_bits=MAX_BITS, policy=DEFAULT_POLICY):
+    """Returns (stream codec header, block encoding function) for blocks.compress_stream.
+
+    One LZWEncoder is shared by all blocks, so the dictionary carries over.
+    """
+    encoder = LZWEncoder(max_bits, policy)
+
+    def encode(data):
+        return b'', encoder.encode_block(data)
+
+    return bytes([max_bits, POLICIES.index(policy)]), encode
+
+
+def block_decoder(codec_header):
+    """Returns the block decoding function for blocks.iter_decompressed."""
+    return LZWDecoder(_read_max_bits(codec_header)).decode_block
+
 
+def add_arguments(parser):
+    """Adds the LZW-specific command-line options."""
+    parser.add_argument('--max-bits', type=int, default=MAX_BITS,
+                        help=f"largest code width, {MIN_WIDTH}-{MAX_BITS_LIMIT} (default {MAX_BITS})")
+    parser.add_argument('--policy', choices=POLICIES, default=DEFAULT_POLICY,
+                        help=f"what to do when the dictionary is full (default {DEFAULT_POLICY})")
 
 
 if __name__ == "__main__":
-    
-    if len(sys.argv) != 4:
-        print("Usage: python lzw.py <mode> <input_file> <output_file>")
-        print("Example (compress): python lzw.py compress sample.txt lzw_compressed.bin")
-        print("Example (decompress): python lzw.py decompress lzw_compressed.bin decompressed.txt")
-        sys.exit(1)
-        
-    mode = sys.argv[1]
-    input_file = sys.argv[2]
-    output_file = sys.argv[3]
-    
-    if mode == 'compress':
-        compress_file(input_file, output_file)
-    elif mode == 'decompress':
-        decompress_file(input_file, output_file)
-    else:
-        print(f"Error: Invalid mode '{mode}'. Please use 'compress' or 'decompress'.")
-        sys.exit(1)
\ No newline at end of file
+    cli.main(sys.modules[__name__], "lzw.py")
@@ -0,0 +1,245 @@
+"""Canonical codes, bit packing and table-driven decoding shared by the prefix-code algorithms (Huffman, Shannon-Fano)."""
+from collections import Counter
+
+from bitio import BitReader, BitWriter, is_bytes
+from container import read_varint, write_varint
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Number of bits used to index the primary decode table.
+PRIMARY_BITS = 10
+# Codes that need a bigger subtable than this are matched bit by bit instead.
+MAX_SUBTABLE_BITS = 12
+# A code-length header stores each length in one byte.
+MAX_CODE_LENGTH_LIMIT = 255
+
+
+def count_symbols(data):
+    """Counts every symbol, listing them in the order they first appear in data.
+
+    Bytes are counted with np.bincount when NumPy is installed. The order
+    matters: it breaks frequency ties when the code trees are built, so both
+    paths must produce the same table.
+    """
+    if np is None or not is_bytes(data) or not len(data):
+        return dict(Counter(data))
+    symbols = np.frombuffer(data, dtype=np.uint8)
+    counts = np.bincount(symbols, minlength=256)
+    present = np.count_nonzero(counts)
+    # Every symbol usually shows up early, so look for first occurrences in
+    # a growing prefix instead of sorting the whole input.
+    window = 4096
+    while True:
+        seen, first = np.unique(symbols[:window], return_index=True)
+        if len(seen) == present:
+            break
+        window *= 4
+    return {int(symbol): int(counts[symbol]) for symbol in seen[np.argsort(first)]}
+
+
+def code_lengths(codes_table):
+    """Returns the length of every code, with a minimum of one bit."""
+    return {symbol: max(1, len(code)) for symbol, code in codes_table.items()}
+
+
+def canonical_codes(lengths):
+    """Assigns canonical codes: shorter codes first, ties broken by symbol order."""
+    codes = {}
+    code = 0
+    previous_length = 0
+    for symbol, length in sorted(lengths.items(), key=lambda item: (item[1], item[0])):
+        code <<= length - previous_length
+        codes[symbol] = bin(code)[2:].zfill(length)
+        code += 1
+        previous_length = length
+    return codes
+
+
+def build_code_bits(codes_table):
+    """Turns each '0'/'1' code string into an (integer value, bit length) pair."""
+    return {symbol: (int(code, 2) if code else 0, len(code)) for symbol, code in codes_table.items()}
+
+
+def encode_to_bytes(data, codes_table):
+    """Packs the code of every symbol straight into bytes, without building a bit string."""
+    writer = BitWriter()
+    writer.write_codes(data, build_code_bits(codes_table))
+    return writer.getvalue()
+
+
+def pack_code_lengths(lengths):
+    """Serializes {integer symbol: code length} as a compact header.
+
+    Layout: symbol count, then for each symbol in ascending order the gap
+    from the previous symbol (both varints) followed by its length as a byte.
+    """
+    header = bytearray()
+    write_varint(header, len(lengths))
+    previous = 0
+    for symbol in sorted(lengths):
+        write_varint(header, symbol - previous)
+        header.append(lengths[symbol])
+        previous = symbol
+    return bytes(header)
+
+
+def unpack_code_lengths(header):
+    """Reads a header written by pack_code_lengths back into {symbol: length}.
+
+    Raises ValueError if the header is cut short, lists a symbol twice, has
+    a length of zero, or has lengths that no prefix code can have (their
+    Kraft sum, the share of the code space they claim, is above one).
+    """
+    lengths = {}
+    symbol = 0
+    try:
+        count, position = read_varint(header, 0)
+        for _ in range(count):
+            gap, position = read_varint(header, position)
+            if lengths and not gap:
+                raise ValueError("Bad code-length header: a symbol is listed twice")
+            symbol += gap
+            lengths[symbol] = header[position]
+            position += 1
+    except IndexError:
+        raise ValueError("Bad code-length header: it is cut short") from None
+    if not all(1 <= length <= MAX_CODE_LENGTH_LIMIT for length in lengths.values()):
+        raise ValueError("Bad code-length header: a code length is out of range")
+    if sum(1 << (MAX_CODE_LENGTH_LIMIT - length) for length in lengths.values()) > 1 << MAX_CODE_LENGTH_LIMIT:
+        raise ValueError("Bad code-length header: the lengths overfill the code space")
+    return lengths
+
+
+def build_decode_tables(codes_table, primary_bits=PRIMARY_BITS):
+    """Builds the primary lookup table (and overflow subtables) for a codes table.
+
+    Symbols are byte values. Every primary entry is a tuple (fragment,
+    bit_count, subtable, sub_bits). When subtable is None, fragment holds
+    the bytes of every symbol that fits completely in the next primary_bits
+    bits and bit_count is how many bits they use. Otherwise the next code is
+    longer than primary_bits, and the following sub_bits bits index
+    subtable, whose entries are (symbol as bytes, code_length); bits that
+    start no code give (b'', 0). A group of codes that would need more
+    than MAX_SUBTABLE_BITS bits of subtable gets sub_bits 0 and a dict
+    {(code_length, code value): symbol as bytes} instead.
+    """
+    max_length = max(len(code) for code in codes_table.values())
+    table_bits = min(primary_bits, max_length)
+    table_size = 1 << table_bits
+
+    # Single-symbol view of the primary table: (symbol, length) or None.
+    single = [None] * table_size
+    long_codes = {}
+    for symbol, code in codes_table.items():
+        length = len(code)
+        value = int(code, 2)
+        if length <= table_bits:
+            shift = table_bits - length
+            start = value << shift
+            for index in range(start, start + (1 << shift)):
+                single[index] = (symbol, length)
+        else:
+            prefix = value >> (length - table_bits)
+            long_codes.setdefault(prefix, []).append((symbol, value, length))
+
+    primary = [None] * table_size
+    for prefix, group in long_codes.items():
+        sub_bits = max(length for _, _, length in group) - table_bits
+        if sub_bits > MAX_SUBTABLE_BITS:
+            primary[prefix] = (None, 0, {(length, value): bytes((symbol,)) for symbol, value, length in group}, 0)
+            continue
+        subtable = [(b'', 0)] * (1 << sub_bits)
+        for symbol, value, length in group:
+            rest = length - table_bits
+            shift = sub_bits - rest
+            start = (value & ((1 << rest) - 1)) << shift
+            for index in range(start, start + (1 << shift)):
+                subtable[index] = (bytes((symbol,)), length)
+        primary[prefix] = (None, 0, subtable, sub_bits)
+
+    mask = table_size - 1
+    for index in range(table_size):
+        if primary[index] is not None:
+            continue
+        # Greedily decode as many whole codes as fit in this index's bits.
+        symbols = []
+        used = 0
+        while used < table_bits:
+            entry = single[(index << used) & mask]
+            if entry is None or entry[1] > table_bits - used:
+                break
+            symbols.append(entry[0])
+            used += entry[1]
+        primary[index] = (bytes(symbols), used, None, 0)
+
+    return primary, table_bits, max_length
+
+
+def decode_bytes(byte_array, padding_amount, codes_table):
+    """Decodes packed bytes directly, consuming up to a whole primary index per lookup.
+
+    The symbols go straight into one bytearray, which is returned.
+    """
+    if not 0 <= padding_amount < 8:
+        raise ValueError("Bad compressed data: the padding is out of range")
+    if not byte_array or not codes_table:
+        return b""
+    primary, table_bits, max_length = build_decode_tables(codes_table)
+    if max_length == 0:
+        return b""
+
+    data = bytes(byte_array)
+    data_length = len(data)
+    bits_left = data_length * 8 - padding_amount
+    decoded = bytearray()
+
+    table_mask = (1 << table_bits) - 1
+    accumulator = 0
+    bit_count = 0
+    position = 0
+    while bits_left >= max_length:
+        while bit_count < max_length:
+            chunk = data[position:position + 8]
+            position += len(chunk)
+            accumulator = ((accumulator & ((1 << bit_count) - 1)) << (len(chunk) * 8)) | int.from_bytes(chunk, 'big')
+            bit_count += len(chunk) * 8
+
+        fragment, used, subtable, sub_bits = primary[(accumulator >> (bit_count - table_bits)) & table_mask]
+        if subtable is None:
+            decoded += fragment
+        elif sub_bits:
+            symbol, used = subtable[(accumulator >> (bit_count - table_bits - sub_bits)) & ((1 << sub_bits) - 1)]
+            decoded += symbol
+        else:
+            # A rare, very long code: try each length in turn.
+            used = 0
+            for length in range(table_bits + 1, max_length + 1):
+                symbol = subtable.get((length, (accumulator >> (bit_count - length)) & ((1 << length) - 1)))
+                if symbol is not None:
+                    decoded += symbol
+                    used = length
+                    break
+        if not used:
+            raise ValueError("Bad compressed data: no code matches the next bits")
+        bit_count -= used
+        bits_left -= used
+
+    # Fewer than max_length bits remain: finish them one bit at a time.
+    if bits_left:
+        reader = BitReader(data, data_length * 8 - padding_amount)
+        reader.position = reader.bit_length - bits_left
+        reversed_codes_table = {(len(code), int(code, 2)): symbol for symbol, code in codes_table.items()}
+        value = 0
+        length = 0
+        while reader.bits_left():
+            value = (value << 1) | reader.read(1)
+            length += 1
+            if (length, value) in reversed_codes_table:
+                decoded.append(reversed_codes_table[(length, value)])
+                value = 0
+                length = 0
+
+    return decoded
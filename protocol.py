@@ -0,0 +1,128 @@
+"""Framed request/response protocol spoken by server.py, client.py and loadtest.py.
+
+The client sends one request:
+
+    magic          4 bytes   b'DAAQ'
+    version        1 byte
+    algorithm      1 byte    0 to send the file as it is, or a container.py
+                             algorithm id to have the server compress it on the fly
+    name size      2 bytes
+    offset         8 bytes   first byte of the file to send
+    length         8 bytes   number of bytes to send (ALL for the rest of the file)
+    name           variable  UTF-8 file name
+
+and the server answers with one response header followed by the data:
+
+    magic          4 bytes   b'DAAR'
+    version        1 byte
+    status         1 byte    one of the status codes below
+    total size     8 bytes   size of the whole file
+    offset         8 bytes   where the data that follows starts in the file
+    length         8 bytes   number of data bytes that follow (ALL: until the connection closes)
+    checksum       4 bytes   CRC-32 of the whole file
+
+All integers are big-endian. When the status is not OK, no data follows.
+Because the response carries the total size and checksum of the whole
+file, a client can resume an interrupted download from the bytes it
+already has and still verify the finished file.
+
+When a request names an algorithm, offset and length still select the
+bytes of the original file, and the data that follows is those bytes as a
+block container (see blocks.py), produced while it is being sent. Its
+length is not known in advance, so the response length is ALL, and the
+checksum is 0 because the container carries checksums of its own.
+"""
+import struct
+from collections import namedtuple
+
+REQUEST_MAGIC = b'DAAQ'
+RESPONSE_MAGIC = b'DAAR'
+VERSION = 1
+
+# Length meaning "up to the end of the file".
+ALL = (1 << 64) - 1
+
+# Response status codes.
+OK = 0
+NOT_FOUND = 1
+BAD_REQUEST = 2
+BAD_RANGE = 3
+
+STATUS_NAMES = {
+    OK: 'ok',
+    NOT_FOUND: 'file not found',
+    BAD_REQUEST: 'bad request',
+    BAD_RANGE: 'offset is past the end of the file',
+}
+
+# Request algorithm meaning "send the file as it is".
+STORED = 0
+
+_REQUEST = struct.Struct('>4sBBHQQ')
+_RESPONSE = struct.Struct('>4sBBQQQI')
+
+Request = namedtuple('Request', ['name', 'offset', 'length', 'algorithm'])
+Response = namedtuple('Response', ['status', 'total_size', 'offset', 'length', 'checksum'])
+
+
+class ProtocolError(ValueError):
+    """Raised when the other side does not speak this protocol."""
+
+
+def pack_request(name, offset=0, length=None, algorithm=STORED):
+    """Encodes a request for length bytes of name starting at offset (the rest of the file if length is None)."""
+    encoded_name = name.encode('utf-8')
+    if len(encoded_name) > 0xFFFF:
+        raise ValueError("File name is too long")
+    return _REQUEST.pack(REQUEST_MAGIC, VERSION, algorithm, len(encoded_name), offset,
+                         ALL if length is None else length) + encoded_name
+
+
+def _unpack_request_header(raw):
+    magic, version, algorithm, name_size, offset, length = _REQUEST.unpack(raw)
+    if magic != REQUEST_MAGIC or version > VERSION:
+        raise ProtocolError("not a transfer request")
+    return algorithm, name_size, offset, length
+
+
+async def read_request(reader):
+    """Reads a request from an asyncio StreamReader."""
+    algorithm, name_size, offset, length = _unpack_request_header(await reader.readexactly(_REQUEST.size))
+    try:
+        name = (await reader.readexactly(name_size)).decode('utf-8')
+    except UnicodeDecodeError:
+        raise ProtocolError("file name is not valid UTF-8") from None
+    return Request(name, offset, length, algorithm)
+
+
+def pack_response(status, total_size=0, offset=0, length=0, checksum=0):
+    """Encodes a response header; with status OK, length data bytes must follow it."""
+    return _RESPONSE.pack(RESPONSE_MAGIC, VERSION, status, total_size, offset, length, checksum)
+
+
+def _unpack_response(raw):
+    magic, version, status, total_size, offset, length, checksum = _RESPONSE.unpack(raw)
+    if magic != RESPONSE_MAGIC or version > VERSION:
+        raise ProtocolError("not a transfer response")
+    return Response(status, total_size, offset, length, checksum)
+
+
+async def read_response(reader):
+    """Reads a response header from an asyncio StreamReader."""
+    return _unpack_response(await reader.readexactly(_RESPONSE.size))
+
+
+def receive_exactly(sock, size):
+    """Reads exactly size bytes from a blocking socket."""
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("connection closed early")
+        data += chunk
+    return bytes(data)
+
+
+def receive_response(sock):
+    """Reads a response header from a blocking socket."""
+    return _unpack_response(receive_exactly(sock, _RESPONSE.size))
@@ -1,49 +1,302 @@
-import socket
+"""Long-running file server for the client-server transfer simulation.
+
+A client connects and sends one request for (part of) a file; the server
+answers with a response header and the requested bytes, then closes the
+connection (see protocol.py). Connections are served concurrently on an
+asyncio event loop, and files are sent with loop.sendfile, which uses
+os.sendfile (zero-copy) where the platform supports it. Only files inside
+the served directory (--root, the current directory by default) can be
+requested.
+
+A request can also ask for a file to be compressed on the fly. The file is
+then compressed block by block on a separate thread while the blocks
+already compressed are being sent, so reading, compressing and sending
+overlap instead of running one after another. With --cache, the
+compressed result is also kept in the compressed-file cache (see cache.py),
+and the next request for the same bytes, algorithm and range is sent
+straight from there.
+
+Usage: python server.py [--host HOST] [--port PORT] [--root DIR] [--workers N] [--cache]
+"""
+import argparse
+import asyncio
+import contextlib
 import os
+import threading
+import time
+
+import api
+import blocks
+import cache
+import container
+import protocol
+
+HOST = '127.0.0.1'
+PORT = 9999
+BUFFER_SIZE = 64 * 1024
+# Block size for on-the-fly compression; small blocks get the first bytes out sooner.
+STREAM_BLOCK_SIZE = 1024 * 1024
+# Compressed chunks of BUFFER_SIZE that may wait to be sent, per connection.
+PIPELINE_DEPTH = 16
+
+# path -> (size, modification time, CRC-32), so each file is checksummed once.
+_checksums = {}
+
+
+def resolve_request(root, filename):
+    """Maps a requested filename to a file inside root, or returns None if there is no such file."""
+    path = os.path.realpath(os.path.join(root, filename))
+    if os.path.commonpath([root, path]) != root or not os.path.isfile(path):
+        return None
+    return path
+
+
+def file_checksum(path):
+    """CRC-32 of a whole file, remembered until the file changes."""
+    stat = os.stat(path)
+    cached = _checksums.get(path)
+    if cached and cached[:2] == (stat.st_size, stat.st_mtime_ns):
+        return cached[2]
+    checksum_value = 0
+    with open(path, 'rb') as f:
+        for chunk in container.iter_payload(f, BUFFER_SIZE):
+            checksum_value = container.checksum(chunk, checksum_value)
+    _checksums[path] = (stat.st_size, stat.st_mtime_ns, checksum_value)
+    return checksum_value
+
+
+class TransferCancelled(Exception):
+    """Raised in a compressing thread when its client has gone away."""
+
+
+class _RangeReader:
+    """Reads at most length bytes from a file, so only the requested range is compressed."""
+
+    def __init__(self, f, length):
+        self.f = f
+        self.remaining = length
+
+    def read(self, size):
+        data = self.f.read(min(size, self.remaining))
+        self.remaining -= len(data)
+        return data
+
+
+class _ChunkWriter:
+    """File-like sink that hands compressed output to the sending coroutine in BUFFER_SIZE pieces.
+
+    put blocks while the connection's queue is full, which holds the
+    compressing thread back when the network is the slower stage.
+    """
+
+    def __init__(self, put, cancelled, copy=None):
+        self.put = put
+        self.cancelled = cancelled
+        self.copy = copy
+        self.buffer = bytearray()
+
+    def write(self, data):
+        self.buffer += data
+        if len(self.buffer) >= BUFFER_SIZE:
+            self.flush()
+
+    def flush(self):
+        if self.cancelled.is_set():
+            raise TransferCancelled()
+        if self.buffer:
+            self.put(bytes(self.buffer))
+            if self.copy is not None:
+                self.copy.write(self.buffer)
+            self.buffer.clear()
+
+
+def compress_range(path, offset, length, algorithm, workers, put, cancelled, artifacts=None, key=None):
+    """Compresses a range of a file into a block container, passing it to put; runs on its own thread.
+
+    Ends with put(None), or with put(exception) if compression failed. With
+    a cache.Cache and a key, a copy of the container is added to the cache
+    once it is complete.
+    """
+    temp_path = artifacts.new_file() if key is not None else None
+    started = time.perf_counter()
+    try:
+        with open(path, "rb") as f, (open(temp_path, "wb") if temp_path else contextlib.nullcontext()) as copy:
+            f.seek(offset)
+            sink = _ChunkWriter(put, cancelled, copy)
+            blocks.compress_stream(_RangeReader(f, length), sink, algorithm, STREAM_BLOCK_SIZE, workers)
+            sink.flush()
+        if temp_path:
+            compressed_size = os.path.getsize(temp_path)
+            stats = api.Stats(container.ALGORITHM_NAMES[algorithm], length, compressed_size,
+                              length / compressed_size, time.perf_counter() - started)
+            artifacts.add(key, temp_path, stats._asdict())
+            temp_path = None
+    except TransferCancelled:
+        return
+    except Exception as e:
+        # Anything, including a broken worker pool, must reach send_compressed or it waits forever.
+        put(e)
+        return
+    finally:
+        if temp_path:
+            artifacts.discard(temp_path)
+    put(None)
+
+
+async def send_compressed(writer, path, offset, length, algorithm, workers, artifacts=None, key=None):
+    """Streams a range of a file compressed with algorithm; returns the number of bytes sent."""
+    loop = asyncio.get_running_loop()
+    chunks = asyncio.Queue(PIPELINE_DEPTH)
+    cancelled = threading.Event()
+
+    def put(chunk):
+        asyncio.run_coroutine_threadsafe(chunks.put(chunk), loop).result()
+
+    threading.Thread(target=compress_range,
+                     args=(path, offset, length, algorithm, workers, put, cancelled, artifacts, key),
+                     daemon=True).start()
+    sent = 0
+    try:
+        while True:
+            chunk = await chunks.get()
+            if chunk is None:
+                return sent
+            if isinstance(chunk, Exception):
+                raise chunk
+            writer.write(chunk)
+            await writer.drain()
+            sent += len(chunk)
+    finally:
+        # Unblock the compressing thread if it is waiting on a full queue; it then stops.
+        cancelled.set()
+        while not chunks.empty():
+            chunks.get_nowait()
+
+
+def cache_key(artifacts, path, offset, length, algorithm, workers):
+    """Cache key of a range of a file compressed for sending; a whole file is keyed like compress_path's."""
+    params = {'block_size': STREAM_BLOCK_SIZE, 'parallel': workers != 1}
+    if offset != 0 or length != os.path.getsize(path):
+        params.update(offset=offset, length=length)
+    return artifacts.file_key(path, container.ALGORITHM_NAMES[algorithm], **params)
+
+
+async def handle_client(reader, writer, root, workers=1, artifacts=None):
+    """Serves one connection: reads the request and sends the requested bytes back.
+
+    artifacts is the cache.Cache for compressed transfers, if there is one.
+    """
+    client_address = writer.get_extra_info('peername')
+    print(f"[+] Accepted connection from {client_address[0]}:{client_address[1]}")
+    try:
+        try:
+            request = await protocol.read_request(reader)
+        except (asyncio.IncompleteReadError, protocol.ProtocolError) as e:
+            print(f"[!] Error: Bad request ({e}).")
+            writer.write(protocol.pack_response(protocol.BAD_REQUEST))
+            return
+        print(f"[+] Client is requesting file: {request.name} (offset {request.offset})")
+
+        if request.algorithm != protocol.STORED and request.algorithm not in container.ALGORITHM_NAMES:
+            print(f"[!] Error: Unknown algorithm id {request.algorithm}.")
+            writer.write(protocol.pack_response(protocol.BAD_REQUEST))
+            return
+
+        path = resolve_request(root, request.name)
+        if path is None:
+            print(f"[!] Error: File '{request.name}' not found on server.")
+            writer.write(protocol.pack_response(protocol.NOT_FOUND))
+            return
+
+        loop = asyncio.get_running_loop()
+        if request.algorithm != protocol.STORED:
+            total_size = os.path.getsize(path)
+            if request.offset > total_size:
+                print(f"[!] Error: Offset {request.offset} is past the end of '{request.name}'.")
+                writer.write(protocol.pack_response(protocol.BAD_RANGE, total_size))
+                return
+            length = min(request.length, total_size - request.offset)
+            algorithm_name = container.ALGORITHM_NAMES[request.algorithm]
+            key = hit = None
+            if artifacts is not None:
+                # Hashing reads the whole file (only the first time), so keep it off the event loop.
+                key = await loop.run_in_executor(None, cache_key, artifacts, path, request.offset, length,
+                                                 request.algorithm, workers)
+                hit = artifacts.get(key)
+            writer.write(protocol.pack_response(protocol.OK, total_size, request.offset, protocol.ALL))
+            if hit is not None:
+                await writer.drain()
+                with open(hit[0], "rb") as f:
+                    sent = await loop.sendfile(writer.transport, f)
+                source = "from the cache"
+            else:
+                sent = await send_compressed(writer, path, request.offset, length, request.algorithm, workers,
+                                             artifacts, key)
+                source = "compressed on the fly"
+            print(f"[+] Sent '{request.name}' ({length} bytes as {sent} bytes of {algorithm_name}, {source}) "
+                  f"to {client_address[0]}:{client_address[1]}")
+            return
+
+        # Checksumming reads the whole file, so keep it off the event loop.
+        checksum_value = await loop.run_in_executor(None, file_checksum, path)
+        with open(path, "rb") as f:
+            total_size = os.fstat(f.fileno()).st_size
+            if request.offset > total_size:
+                print(f"[!] Error: Offset {request.offset} is past the end of '{request.name}'.")
+                writer.write(protocol.pack_response(protocol.BAD_RANGE, total_size, checksum=checksum_value))
+                return
+            length = min(request.length, total_size - request.offset)
+            writer.write(protocol.pack_response(protocol.OK, total_size, request.offset, length, checksum_value))
+            await writer.drain()
+            if length:
+                await loop.sendfile(writer.transport, f, request.offset, length)
+        print(f"[+] Sent '{request.name}' ({length} bytes) to {client_address[0]}:{client_address[1]}")
+
+    except Exception as e:
+        print(f"[!] An error occurred: {e or type(e).__name__}")
+
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+
+
+async def serve(host=HOST, port=PORT, root='.', workers=1, artifacts=None):
+    """Accepts clients until cancelled."""
+    root = os.path.realpath(root)
+    server = await asyncio.start_server(
+        lambda reader, writer: handle_client(reader, writer, root, workers, artifacts),
+        host, port, reuse_address=True)
+    print(f"Server is listening on {host}:{port}, serving files from {root}...")
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python server.py", description="Serves files to client.py.")
+    parser.add_argument('--host', default=HOST, help=f"address to listen on (default {HOST})")
+    parser.add_argument('--port', type=int, default=PORT, help=f"port to listen on (default {PORT})")
+    parser.add_argument('--root', default='.', help="directory to serve files from (default: current directory)")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="processes compressing each on-the-fly transfer; 0 uses every CPU (default 1)")
+    parser.add_argument('--cache', action='store_true',
+                        help="keep files compressed on the fly and send them from the cache next time "
+                             "(cache in $DAA_CACHE_DIR, or ~/.cache/daa-compression)")
+    parser.add_argument('--cache-size', type=blocks.parse_size, default=cache.DEFAULT_MAX_BYTES,
+                        help="with --cache: largest total size of the cache, e.g. 512M (default 512M)")
+    args = parser.parse_args(argv)
+    if args.cache_size < 0:
+        parser.error("--cache-size cannot be negative")
+    artifacts = cache.Cache(max_bytes=args.cache_size) if args.cache else None
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.root, args.workers, artifacts))
+    except KeyboardInterrupt:
+        pass
+    print("[+] Server stopped.")
+
 
-HOST = '127.0.0.1' 
-PORT = 9999        
-BUFFER_SIZE = 4096 
-
-server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-server_socket.bind((HOST, PORT))
-
-server_socket.listen()
-print(f"Server is listening on {HOST}:{PORT}...")
-print("Waiting for a client to connect...")
-
-client_socket, client_address = server_socket.accept()
-print(f"[+] Accepted connection from {client_address[0]}:{client_address[1]}")
-
-try:
-   
-    filename_request = client_socket.recv(BUFFER_SIZE).decode()
-    print(f"[+] Client is requesting file: {filename_request}")
-
-
-    if os.path.exists(filename_request):
-        print(f"[+] File found. Sending '{filename_request}'...")
-        
-
-        with open(filename_request, "rb") as f:
-            while True:
-                bytes_read = f.read(BUFFER_SIZE)
-                
-                if not bytes_read:
-                    break
-                    
-                client_socket.sendall(bytes_read)
-        
-        print(f"[+] File sent successfully.")
-        
-    else:
-        print(f"[!] Error: File '{filename_request}' not found on server.")
-
-except Exception as e:
-    print(f"[!] An error occurred: {e}")
-
-finally:
-    client_socket.close()
-    server_socket.close()
-    print("[+] Connections closed.")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
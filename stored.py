@@ -0,0 +1,34 @@
+"""Stored "compression": the payload is the data itself.
+
+auto.py uses it for blocks that no codec would shrink, so they cost only
+their block header. It can also be chosen like any other algorithm, e.g. as
+a baseline in bench.py.
+"""
+import sys
+import cli
+
+VERSION = 1
+INDEPENDENT_BLOCKS = True
+
+
+def encode_payload(data):
+    """Returns (codec header, payload) for the container format: no header and the bytes unchanged."""
+    return b'', bytes(data)
+
+
+def decode_payload(codec_header, payload):
+    return bytes(payload)
+
+
+def block_encoder():
+    """Returns (stream codec header, block encoding function) for blocks.compress_stream."""
+    return b'', encode_payload
+
+
+def block_decoder(codec_header):
+    """Returns the block decoding function for blocks.iter_decompressed."""
+    return decode_payload
+
+
+if __name__ == "__main__":
+    cli.main(sys.modules[__name__], "stored.py")